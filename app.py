@@ -1,8 +1,11 @@
 import streamlit as st
-from utils.groq_llm import query_groq
+from utils.groq_llm import query_groq, build_payload, get_cached_response
+from utils.prompts import EVENT_TYPES, build_insight_prompt
 from sources.aggregator import aggregate_articles
-from sources.openfda_source import get_openfda_query_categories, get_queries_for_category
+from sources.registry import get_loaded_sources, get_unavailable_sources
+from utils.metrics import record_cache_lookup, registry as metrics_registry
 from datetime import datetime, timedelta
+import uuid
 
 st.set_page_config(page_title="MedTech Insight Extractor", layout="wide")
 
@@ -56,10 +59,39 @@ with st.sidebar.expander("🧭 Philosophy of Insight"):
 selected_source_label = st.sidebar.radio("🧭 Sources to use", list(source_options.keys()))
 selected_sources = source_options[selected_source_label]
 
+@st.cache_resource(ttl="12h", show_spinner="Loading OpenFDA company and product code index…")
+def build_cached_entity_index():
+    # Built from OpenFDA classification and applicant data, rebuilt every 12 hours
+    # so a partial index left by a failed download does not stay for good.
+    # Raises when nothing loaded, so a failure is not cached here.
+    from sources.entity_index import build_entity_index
+    return build_entity_index()
+
+@st.cache_resource(ttl="5m", show_spinner=False)
+def load_entity_index():
+    """(index, error): a failed build is remembered for 5 minutes instead of retried on every rerun"""
+    from sources.entity_index import EntityIndex
+    try:
+        return build_cached_entity_index(), None
+    except Exception as e:
+        return EntityIndex(), str(e)
+
+def get_entity_index():
+    """The cached entity index, or an empty one while OpenFDA cannot be reached"""
+    index, error = load_entity_index()
+    if error:
+        st.sidebar.warning(f"Company and product code lookup is unavailable: {error}")
+    return index
+
 # OpenFDA query configuration
 openfda_params = None
+entity_index = None
 if "openfda" in selected_sources:
     st.sidebar.header("📊 OpenFDA Queries")
+    # Imported here so the OpenFDA module is only loaded when the source is selected
+    from sources.openfda_source import get_openfda_query_categories, get_queries_for_category
+    from sources.entity_index import COMPANY_PARAMETERS, PRODUCT_CODE_PARAMETERS
+    entity_index = get_entity_index()
     
     # Query category selection
     categories = get_openfda_query_categories()
@@ -97,6 +129,29 @@ if "openfda" in selected_sources:
                     key=f"openfda_{param_name}",
                     placeholder=f"e.g., {default_value}" if default_value else "Enter value"
                 )
+
+                # Autocomplete from the entity index; picking a suggestion replaces the typed value
+                typed = parameters[param_name].strip()
+                suggestions = []
+                if typed and param_name in COMPANY_PARAMETERS:
+                    suggestions = entity_index.suggest_companies(typed)
+                elif typed and param_name in PRODUCT_CODE_PARAMETERS:
+                    suggestions = entity_index.suggest_product_codes(typed)
+                if suggestions and suggestions != [typed]:
+                    describe = entity_index.describe_product_code if param_name in PRODUCT_CODE_PARAMETERS else str
+                    choice = st.sidebar.selectbox(
+                        "Suggestions",
+                        [None] + suggestions,
+                        format_func=lambda s: "Use as typed" if s is None else describe(s),
+                        key=f"openfda_{param_name}_suggestion"
+                    )
+                    if choice:
+                        parameters[param_name] = choice
+
+        # Map misspelled companies and device names onto values OpenFDA knows, avoiding 404 fallbacks
+        parameters, corrections = entity_index.canonicalize_parameters(parameters)
+        for param_name, (typed, canonical) in corrections.items():
+            st.sidebar.caption(f"Searching for “{canonical}” instead of “{typed}”")
         
         # Validate that required parameters are filled
         missing_params = [name for name, value in parameters.items() if not value.strip()]
@@ -109,91 +164,141 @@ if "openfda" in selected_sources:
                 "parameters": parameters
             }
 
+@st.cache_resource
+def get_prefetcher():
+    # A single low-priority worker shared by all sessions
+    from utils.prefetch import InsightPrefetcher
+    return InsightPrefetcher()
+
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+
+@st.cache_resource
+def get_insight_store():
+    # One store per server process, shared by all sessions
+    from utils.insights import InsightStore
+    return InsightStore()
+
 # Sidebar search
 with st.sidebar:
     st.header("🔍 Search Configuration")
     user_query = st.text_input("Enter keyword", value="robotic surgery")
     max_results = st.slider("Max articles per source", 5, 20, 10)
+    relevance_weight = st.slider(
+        "Relevance vs. recency", 0.0, 1.0, 0.7, step=0.1,
+        help="1.0 ranks purely by keyword relevance (BM25), 0.0 purely by date"
+    )
     system_msg = st.text_input("System Prompt", value="Extract key device insights for MedTech sales teams.")
     show_raw = st.checkbox("Show Raw LLM Output", value=False)
+    prefetch_enabled = st.checkbox("⚡ Prefetch insights for top articles", value=False)
+    prefetch_top_n = st.slider("Articles to prefetch", 1, 10, 5) if prefetch_enabled else 0
     show_debug = st.checkbox("Show Diagnostic Logs", value=False)
 
 # Aggregate articles
+articles = []
 try:
     articles = aggregate_articles(
         query=user_query, 
         max_results=max_results, 
         sources=selected_sources,
-        openfda_params=openfda_params
+        openfda_params=openfda_params,
+        relevance_weight=relevance_weight
     )
     
+    # Speculatively extract insights for the top results; a new query cancels the old batch
+    if prefetch_enabled and articles:
+        get_prefetcher().schedule(st.session_state["session_id"], articles, system_msg, top_n=prefetch_top_n)
+    elif st.session_state.get("prefetch_scheduled"):
+        get_prefetcher().cancel(st.session_state["session_id"])
+    st.session_state["prefetch_scheduled"] = prefetch_enabled
+
     if articles:
-        titles = [f"{a['title']} ({a['source']})" for a in articles]
+        if st.button(f"📚 Generate Digest of All {len(articles)} Results"):
+            from utils.digest import build_digest
+            with st.spinner("Summarizing results in chunks…"):
+                digest = build_digest(articles, focus=f"{user_query}. {system_msg}")
+            if digest:
+                st.success(
+                    f"✅ Digest of {digest['articles']} results "
+                    f"({digest['chunks']} chunks, {digest['levels']} levels)"
+                )
+                st.markdown(digest["digest"])
+                if digest["failed_chunks"]:
+                    st.warning(f"{digest['failed_chunks']} chunk(s) could not be summarized.")
+            else:
+                st.error("Could not generate a digest.")
+
+        titles = [a.display_title for a in articles]
         selected_title = st.selectbox("📰 Choose an article", titles)
         
         # Display and extract
         selected_article = next(
-            (a for a in articles if f"{a['title']} ({a['source']})" == selected_title),
+            (a for a in articles if a.display_title == selected_title),
             None
         )
         
         if selected_article:
-            st.markdown(f"### {selected_article['title']}")
-            st.markdown(f"**Source:** {selected_article['source']}")
+            st.markdown(f"### {selected_article.title}")
+            st.markdown(f"**Source:** {selected_article.source}")
+            if selected_article.timestamp:
+                st.caption(selected_article.timestamp.strftime("%Y-%m-%d"))
         
             # Enhanced display for OpenFDA data
-            if "OpenFDA" in selected_article['source']:
+            if selected_article.is_openfda:
                 col1, col2 = st.columns([3, 1])
                 
                 with col1:
                     st.markdown("**Summary:**")
-                    st.info(selected_article["summary"])
+                    st.info(selected_article.summary)
                     
                 with col2:
                     st.markdown("**Actions:**")
-                    if selected_article["url"]:
-                        st.markdown(f"[📚 OpenFDA Docs]({selected_article['url']})")
+                    if selected_article.url:
+                        st.markdown(f"[📚 OpenFDA Docs]({selected_article.url})")
                     
                 with st.expander("📋 Detailed Regulatory Data"):
-                    st.json(selected_article['metadata']['raw_data'])
+                    st.json(selected_article.raw)
                     
                 with st.expander("🔍 Raw API Response"):
-                    st.code(selected_article['raw_text'])
+                    st.code(selected_article.raw_json, language="json")
             
             else:
                 # Regular article display
-                st.markdown(selected_article["summary"])
-                if selected_article["url"]:
-                    st.markdown(f"[Read full article]({selected_article['url']})")
+                st.markdown(selected_article.summary)
+                if selected_article.url:
+                    st.markdown(f"[Read full article]({selected_article.url})")
             
             if st.button("Extract Insights with Groq"):
+                prompt = build_insight_prompt(selected_article)
+                cached = get_cached_response(build_payload(prompt, system_msg)) is not None
                 with st.spinner("Querying Groq LLM…"):
-                    # Enhanced prompt for OpenFDA data
-                    if "OpenFDA" in selected_article['source']:
-                        enhanced_prompt = f"""
-                        Analyze this regulatory data from OpenFDA and provide insights for MedTech professionals:
-                        
-                        TITLE: {selected_article['title']}
-                        SUMMARY: {selected_article['summary']}
-                        
-                        RAW REGULATORY DATA:
-                        {str(selected_article['metadata']['raw_data'])}
-                        
-                        Please provide:
-                        1. Key regulatory insights
-                        2. Potential business implications
-                        3. Competitive intelligence
-                        4. Any safety or compliance concerns
-                        """
-                        result = query_groq(enhanced_prompt, system_message=system_msg)
-                    else:
-                        result = query_groq(selected_article["summary"], system_message=system_msg)
+                    result = query_groq(prompt, system_message=system_msg)
+                    if cached:
+                        st.caption("⚡ Served from cache")
                     
                     if result:
                         st.success("✅ Insight Extracted")
                         st.markdown(result)
                         if show_raw:
                             st.code(result)
+
+            if st.button("Extract Structured Insights (JSON)"):
+                from utils.insights import extract_structured_insight
+                store = get_insight_store()
+                insight = store.get(selected_article.key)
+                record_cache_lookup("insight_store", insight is not None)
+                if insight:
+                    st.caption("Loaded from insight store")
+                else:
+                    with st.spinner("Extracting structured insight…"):
+                        insight = extract_structured_insight(selected_article)
+                    if insight:
+                        store.append(selected_article, insight)
+                if insight:
+                    st.success("✅ Structured Insight")
+                    st.json(insight)
+                else:
+                    st.error("Could not extract a valid structured insight.")
         else:
             st.warning("No articles found. Try adjusting your search criteria.")
         
@@ -201,6 +306,113 @@ except Exception as e:
     st.error(f"Error aggregating articles: {str(e)}")
 
 
+# Query previously extracted structured insights without calling the LLM again
+with st.expander("🗂️ Insight Store"):
+    store_event_type = st.selectbox("Event type", ["All"] + EVENT_TYPES, key="insight_event_type")
+    store_since = st.date_input("Articles since", value=datetime.now() - timedelta(days=90), key="insight_since")
+    if st.button("Query insights"):
+        import pandas as pd
+        store = get_insight_store()
+        event_filter = None if store_event_type == "All" else store_event_type
+        since = pd.Timestamp(store_since, tz="UTC")
+        st.dataframe(store.count_by_company(event_type=event_filter, since=since))
+        st.dataframe(store.query(event_type=event_filter, since=since))
+
+
+# Trend surveillance over adverse event counts for a whole watchlist
+with st.expander("📈 Adverse Event Surveillance"):
+    surveillance_entity = st.radio("Watch by", ["Product code", "Manufacturer"], horizontal=True, key="surveillance_entity")
+    watchlist_text = st.text_area(
+        "Watchlist (comma or newline separated)",
+        value="KYZ, LNI, NIQ, MNH, FRN" if surveillance_entity == "Product code" else "Medtronic, Abbott, Philips",
+        key=f"surveillance_watchlist_{surveillance_entity}"
+    )
+    col1, col2, col3 = st.columns(3)
+    # Labels match utils.surveillance.FREQUENCIES, which is only imported once a run is requested
+    surveillance_freq = col1.selectbox("Granularity", ["Daily", "Weekly"], index=1, key="surveillance_freq")
+    surveillance_days = col2.number_input("Lookback (days)", min_value=60, max_value=3650, value=365, step=30)
+    z_threshold = col3.slider("Spike z-score", 2.0, 6.0, 3.0, step=0.5)
+    use_mirror = st.checkbox("Read counts from the local Parquet mirror (export root)", value=False, key="surveillance_use_mirror")
+    mirror_subdir = st.text_input("Mirror subfolder", value="", key="surveillance_mirror") if use_mirror else ""
+
+    if st.button("Run surveillance"):
+        from utils.surveillance import FREQUENCIES, analyze_watchlist
+        from utils.export import resolve_export_dir
+        watchlist = [v for v in watchlist_text.replace("\n", ",").split(",") if v.strip()]
+        entity = "product_code" if surveillance_entity == "Product code" else "manufacturer"
+        end_date = datetime.now()
+        with st.spinner(f"Building event series for {len(watchlist)} watchlist entries…"):
+            try:
+                result = analyze_watchlist(
+                    watchlist,
+                    end_date - timedelta(days=int(surveillance_days)),
+                    end_date,
+                    entity=entity,
+                    freq=FREQUENCIES[surveillance_freq],
+                    z_threshold=z_threshold,
+                    parquet_dir=resolve_export_dir(mirror_subdir) if use_mirror else None
+                )
+                st.session_state["surveillance"] = dict(result, entity=entity)
+            except Exception as e:
+                st.error(f"Surveillance failed: {str(e)}")
+
+    surveillance = st.session_state.get("surveillance")
+    if surveillance:
+        if surveillance["failed"]:
+            st.warning(f"Could not load: {', '.join(surveillance['failed'])}")
+        spikes = surveillance["spikes"]
+        series = surveillance["series"]
+        # Chart the entities with spikes, or the whole watchlist when nothing was flagged
+        charted = list(dict.fromkeys(spikes["entity"])) or list(series.columns)
+        st.line_chart(series[charted[:10]])
+        if spikes.empty:
+            st.info("No spikes above the threshold.")
+        else:
+            st.markdown(f"**{len(spikes)} spikes flagged**")
+            st.dataframe(spikes)
+            if st.button("Explain spikes with Groq"):
+                from utils.surveillance import narrate_spikes
+                describe = None
+                # Label product codes only with an index already loaded for the OpenFDA source
+                if surveillance["entity"] == "product_code" and entity_index is not None:
+                    describe = entity_index.describe_product_code
+                with st.spinner("Summarizing flagged spikes…"):
+                    narrative = narrate_spikes(spikes, surveillance["entity"], describe)
+                if narrative:
+                    st.markdown(narrative)
+
+
+# Columnar export for downstream analytics
+if articles:
+    with st.sidebar.expander("📦 Export"):
+        # pyarrow is only imported once an export is requested
+        if st.checkbox("Prepare Parquet download", value=False):
+            from utils.export import articles_to_parquet_bytes
+            st.download_button(
+                "Download results (.parquet)",
+                data=articles_to_parquet_bytes(articles),
+                file_name="liberty_articles.parquet",
+                mime="application/octet-stream"
+            )
+        if openfda_params:
+            export_subdir = st.text_input("Export subfolder (inside the export root)", value="")
+            export_max_records = st.number_input("Max OpenFDA records", min_value=100, max_value=25000, value=5000, step=100)
+            if st.button("Export full OpenFDA pull"):
+                from utils.export import export_openfda_query, resolve_export_dir
+                with st.spinner("Streaming OpenFDA pages to Parquet…"):
+                    try:
+                        export_dir = resolve_export_dir(export_subdir)
+                        rows = export_openfda_query(
+                            openfda_params["query_name"],
+                            openfda_params["parameters"],
+                            export_dir,
+                            max_records=int(export_max_records)
+                        )
+                        st.success(f"Wrote {rows} records to {export_dir}/ (partitioned by source and month)")
+                    except Exception as e:
+                        st.error(f"OpenFDA export failed: {str(e)}")
+
+
 # Enhanced diagnostic transparency
 if show_debug:
     with st.expander("🧪 Diagnostic Logs"):
@@ -214,5 +426,23 @@ if show_debug:
             st.code(f"Total Articles Found: {len(articles)}")
             source_counts = {}
             for a in articles:
-                source_counts[a["source"]] = source_counts.get(a["source"], 0) + 1
+                source_counts[a.source] = source_counts.get(a.source, 0) + 1
             st.code(f"Source Breakdown: {source_counts}")
+        st.code(f"Loaded Source Modules: {get_loaded_sources()}")
+        if prefetch_enabled:
+            st.code(f"Prefetch: {get_prefetcher().stats()}")
+        unavailable = get_unavailable_sources()
+        if unavailable:
+            st.code(f"Unavailable Sources: {unavailable}")
+
+        # Metrics are process-wide, so they cover every session served by this server
+        st.markdown("**Latency, transfer and cache metrics**")
+        metrics_rows = metrics_registry.snapshot()
+        if metrics_rows:
+            st.dataframe(metrics_rows)
+        st.download_button(
+            "Download metrics (Prometheus)",
+            data=metrics_registry.render_prometheus(),
+            file_name="liberty_metrics.prom",
+            mime="text/plain"
+        )
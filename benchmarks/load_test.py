@@ -0,0 +1,274 @@
+"""Concurrent-session load test for app.py.
+
+Simulates N analysts at once using Streamlit's AppTest. Each session runs the
+real script in its own thread with its own session state, as the server does.
+Upstreams are served by the local stub server. For each N it reports page
+latency percentiles, memory per session and upstream call counts:
+
+    python -m benchmarks.load_test --sessions 1,5,10,20 --iterations 3 --latency-ms 80 --jitter-ms 40
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.run_benchmarks import git_commit, quiet_streamlit
+from benchmarks.stub_server import StubServer, point_sources_at
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+KEYWORDS = ("robotic surgery", "insulin pump", "cardiac ablation", "continuous glucose monitor")
+
+
+def share_test_runtime():
+    """Let AppTest sessions overlap.
+
+    AppTest installs a mock Runtime singleton for each run and clears it when
+    the run finishes, which breaks any other session still running. Fall back
+    to a shared mock runtime whenever the singleton has been cleared.
+
+    Each run also patches config.get_option to report `global.appTest` and
+    restores it afterwards. Overlapping runs then see the option switch off
+    mid-script, and widget format functions go missing (KeyError on the next
+    interaction). Set the option once for the whole process instead.
+    """
+    import contextlib
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    config.get_option = build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def share_script_cache():
+    """Compile app.py once for all sessions.
+
+    Every AppTest run gets a fresh ScriptCache and compiles the script itself.
+    Compiling in parallel threads intermittently fails on CPython 3.11 with
+    "SystemError: AST constructor recursion depth mismatch". That error
+    would then show up as a spurious app failure. Serialize compilation and
+    reuse the bytecode.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    original = ScriptCache.get_bytecode
+    lock = threading.Lock()
+    compiled = {}
+
+    def get_bytecode(self, script_path):
+        path = os.path.abspath(script_path)
+        with lock:
+            if path not in compiled:
+                compiled[path] = original(self, script_path)
+            return compiled[path]
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))]
+
+
+def _widget(widgets, label):
+    for w in widgets:
+        if w.label == label or w.label.startswith(label):
+            return w
+    raise LookupError(f"Widget not found: {label}")
+
+
+class Session:
+    """One simulated analyst driving the app through a realistic sequence of interactions"""
+
+    def __init__(self, index, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.latencies = []
+        self.errors = []
+
+    def _timed(self, step, action):
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.errors.append(f"{step}: {e}")
+            return
+        self.latencies.append((step, (time.perf_counter() - start) * 1000.0))
+        for exc in self.app.exception:
+            self.errors.append(f"{step}: {exc.message}")
+
+    def run_scenario(self, iteration):
+        app = self.app
+        keyword = KEYWORDS[(self.index + iteration) % len(KEYWORDS)]
+        if iteration == 0:
+            self._timed("initial_load", app.run)
+        self._timed("select_sources", lambda: _widget(app.sidebar.radio, "🧭 Sources to use").set_value("Aggregate all").run())
+        self._timed("change_keyword", lambda: _widget(app.sidebar.text_input, "Enter keyword").set_value(keyword).run())
+
+        def choose_article():
+            selectbox = _widget(app.selectbox, "📰 Choose an article")
+            options = selectbox.options
+            selectbox.set_value(options[(self.index + iteration) % len(options)]).run()
+        self._timed("choose_article", choose_article)
+        self._timed("extract_insights", lambda: _widget(app.button, "Extract Insights with Groq").click().run())
+        self._timed("select_openfda", lambda: _widget(app.sidebar.radio, "🧭 Sources to use").set_value("OpenFDA only").run())
+
+
+def run_level(sessions, iterations, timeout, stub, use_tracemalloc):
+    """Run `sessions` concurrent sessions and return latency, memory and upstream stats"""
+    stub.reset_counts()
+    gc.collect()
+    rss_before = current_rss_bytes()
+    traced_before = tracemalloc.get_traced_memory()[0] if use_tracemalloc else None
+
+    workers = [Session(i, timeout) for i in range(sessions)]
+    barrier = threading.Barrier(sessions)
+
+    def drive(session):
+        barrier.wait()
+        for iteration in range(iterations):
+            session.run_scenario(iteration)
+
+    threads = [threading.Thread(target=drive, args=(s,), name=f"session-{s.index}") for s in workers]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    # Sessions (and their state) are still alive here, so this is memory held per active session
+    gc.collect()
+    rss_after = current_rss_bytes()
+    traced_after = tracemalloc.get_traced_memory()[0] if use_tracemalloc else None
+
+    samples = sorted(ms for s in workers for _, ms in s.latencies)
+    by_step = {}
+    for s in workers:
+        for step, ms in s.latencies:
+            by_step.setdefault(step, []).append(ms)
+    calls = stub.call_counts()
+    errors = [e for s in workers for e in s.errors]
+
+    result = {
+        "sessions": sessions,
+        "page_loads": len(samples),
+        "wall_s": wall,
+        "throughput_pages_per_s": len(samples) / wall if wall else None,
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": samples[-1] if samples else None,
+        "step_p50_ms": {step: statistics.median(values) for step, values in by_step.items()},
+        # RSS is a whole-process figure: freed memory is rarely returned to the OS, so it
+        # cannot be split per session. The per-session figure comes from tracemalloc.
+        "process_rss_bytes": rss_after,
+        "process_rss_growth_bytes": rss_after - rss_before,
+        "upstream_calls": calls,
+        "upstream_calls_per_session": {route: count / sessions for route, count in calls.items()},
+        "active_threads": threading.active_count(),
+        "errors": errors[:20],
+        "error_count": len(errors),
+    }
+    if use_tracemalloc:
+        result["traced_per_session_bytes"] = (traced_after - traced_before) / sessions
+    del workers
+    return result
+
+
+def run(session_levels, iterations, latency_ms, jitter_ms, timeout, use_tracemalloc, seed=0):
+    quiet_streamlit()
+    share_test_runtime()
+    share_script_cache()
+    if use_tracemalloc:
+        tracemalloc.start()
+    levels = []
+    with StubServer(latency_ms=latency_ms, jitter_ms=jitter_ms, seed=seed) as stub:
+        point_sources_at(stub.base_url)
+        # Warm up imports and module-level caches so the first level is not charged for them
+        Session(-1, timeout).run_scenario(0)
+        for sessions in session_levels:
+            level = run_level(sessions, iterations, timeout, stub, use_tracemalloc)
+            levels.append(level)
+            memory = (
+                f"heap/session={level['traced_per_session_bytes'] / 1e6:.1f}MB" if use_tracemalloc
+                else f"process rss={level['process_rss_bytes'] / 1e6:.0f}MB"
+            )
+            print(
+                f"N={sessions:<4} p50={level['p50_ms']:.0f}ms p95={level['p95_ms']:.0f}ms "
+                f"p99={level['p99_ms']:.0f}ms {memory} "
+                f"upstream={sum(level['upstream_calls'].values())} errors={level['error_count']}",
+                file=sys.stderr
+            )
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "iterations": iterations,
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "tracemalloc": use_tracemalloc,
+        },
+        "levels": levels,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test app.py with concurrent simulated sessions")
+    parser.add_argument("--sessions", default="1,5,10,20", help="Comma-separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=2, help="Scenario repetitions per session")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Stub upstream latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Uniform +/- jitter added to latency")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-rerun timeout in seconds")
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="Skip per-session heap measurement (faster; only process RSS is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    report = run(levels, args.iterations, args.latency_ms, args.jitter_ms, args.timeout, args.tracemalloc, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Offline benchmark suite.
+
+Replays recorded upstream responses from a local stub server and measures
+per-source fetch and parse time, aggregate_articles end to end, dedup/sort
+cost at growing article counts, BM25 ranking, adverse event spike detection
+and Groq client overhead. Results are written
+as JSON so runs can be compared across commits:
+
+    python -m benchmarks.run_benchmarks --latency-ms 50 --jitter-ms 20 --output bench.json
+    python -m benchmarks.run_benchmarks --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.stub_server import FIXTURES_DIR, StubServer, point_sources_at
+
+DEDUP_SORT_SIZES = (100, 1000, 10000, 100000)
+RANK_SIZES = (100, 1000, 10000)
+SURVEILLANCE_WATCHLIST_SIZES = (10, 100, 500)
+SURVEILLANCE_DAYS = 730
+VOCABULARY = (
+    "robotic surgery insulin pump cardiac ablation glucose monitor stent catheter recall clearance "
+    "approval trial implant orthopedic imaging diagnostic software neurostimulation valve sensor"
+).split()
+OPENFDA_PARAMS = {
+    "query_type": "Market Intelligence & Competitive Analysis",
+    "query_name": "Devices by Product Code",
+    "parameters": {"product_code": "KYZ"},
+}
+
+
+def quiet_streamlit():
+    # Sources call Streamlit widgets; outside `streamlit run` they log warnings on every call.
+    # Parse the config first, since Streamlit re-applies its configured level when it loads.
+    from streamlit import config, logger
+    config.get_option("logger.level")
+    logger.set_log_level("error")
+
+
+def measure(fn, repeat, warmup=1):
+    """Run fn repeatedly and return timing statistics in milliseconds"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+    }
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def fetch_benchmarks(repeat):
+    from sources.registry import load_source
+    from sources.openfda_source import fetch_openfda_data
+
+    cases = {
+        "fetch.newsapi": lambda: load_source("newsapi")(query="robotic surgery", max_results=20),
+        "fetch.clinical_trials": lambda: load_source("clinical_trials")(max_results=20),
+        "fetch.raps_rss": lambda: load_source("raps_rss")(max_results=20),
+        "fetch.medtechdive": lambda: load_source("medtechdive")(max_results=20),
+        "fetch.fiercebiotech": lambda: load_source("fiercebiotech")(max_results=20),
+        "fetch.openfda": lambda: fetch_openfda_data(max_results=20, **OPENFDA_PARAMS),
+    }
+    return {name: measure(fn, repeat) for name, fn in cases.items()}
+
+
+def parse_benchmarks(repeat):
+    import feedparser
+    from bs4 import BeautifulSoup
+    from sources.clinical_trials_rss import parse_clinical_trials_feed
+    from sources.fiercebiotech_scraper import parse_fiercebiotech_html
+    from sources.medtechdive_scraper import parse_medtechdive_soup
+    from sources.newsapi_source import parse_newsapi_response
+    from sources.openfda_source import parse_openfda_results
+    from sources.raps_rss import parse_raps_feed
+
+    newsapi = read_fixture("newsapi.json")
+    openfda_510k = read_fixture("openfda_510k.json")
+    openfda_event = read_fixture("openfda_event.json")
+    clinical_trials = read_fixture("clinical_trials_rss.xml")
+    raps = read_fixture("raps_rss.xml")
+    medtechdive = read_fixture("medtechdive.html").decode("utf-8")
+    fiercebiotech = read_fixture("fiercebiotech.html").decode("utf-8")
+
+    cases = {
+        "parse.newsapi": lambda: parse_newsapi_response(json.loads(newsapi)),
+        "parse.openfda_510k": lambda: parse_openfda_results(
+            json.loads(openfda_510k)["results"], "/device/510k.json", "OpenFDA - bench", "bench"),
+        "parse.openfda_event": lambda: parse_openfda_results(
+            json.loads(openfda_event)["results"], "/device/event.json", "OpenFDA - bench", "bench"),
+        "parse.clinical_trials": lambda: parse_clinical_trials_feed(feedparser.parse(clinical_trials), 20),
+        "parse.raps_rss": lambda: parse_raps_feed(feedparser.parse(raps), 20),
+        "parse.medtechdive": lambda: parse_medtechdive_soup(BeautifulSoup(medtechdive, "html.parser"), 20),
+        "parse.fiercebiotech": lambda: parse_fiercebiotech_html(fiercebiotech, 20),
+    }
+    return {name: measure(fn, repeat) for name, fn in cases.items()}
+
+
+def aggregate_benchmarks(repeat):
+    from sources.aggregator import aggregate_articles
+
+    sources = ("newsapi", "clinical_trials", "openfda", "medtechdive", "fiercebiotech", "raps_rss")
+    return {
+        "aggregate.all_sources": measure(
+            lambda: aggregate_articles(query="robotic surgery", max_results=20, sources=sources,
+                                       openfda_params=OPENFDA_PARAMS),
+            repeat
+        )
+    }
+
+
+def synthetic_articles(count, seed=0):
+    from sources.article import Article
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    articles = []
+    for i in range(count):
+        # ~10% duplicate titles and ~10% undated items, as seen across real sources
+        title_id = rng.randrange(count) if rng.random() < 0.1 else i
+        timestamp = None if rng.random() < 0.1 else start + timedelta(minutes=rng.randrange(600000))
+        articles.append(Article(
+            title=f"Synthetic article {title_id}",
+            summary=" ".join(rng.choice(VOCABULARY) for _ in range(20)),
+            source=rng.choice(["NewsAPI", "MedTechDive", "ClinicalTrials.gov RSS"]),
+            url=f"https://example.com/{i}",
+            timestamp=timestamp
+        ))
+    return articles
+
+
+def dedup_sort_benchmarks(repeat, sizes=DEDUP_SORT_SIZES):
+    from sources.aggregator import dedupe_articles, sort_articles
+
+    results = {}
+    for size in sizes:
+        articles = synthetic_articles(size)
+        results[f"dedupe.n{size}"] = measure(lambda: dedupe_articles(articles), repeat)
+        results[f"sort.n{size}"] = measure(lambda: sort_articles(articles), repeat)
+    return results
+
+
+def llm_benchmarks(repeat, latency_ms):
+    from utils.groq_llm import query_groq
+
+    prompt = read_fixture("newsapi.json").decode("utf-8")[:4000]
+    uncached = measure(lambda: query_groq(prompt, system_message="bench", use_cache=False, quiet=True), repeat)
+    # Client overhead = round trip minus the stub's configured latency
+    uncached["overhead_ms"] = max(0.0, uncached["median_ms"] - latency_ms)
+    return {
+        "llm.query_groq_uncached": uncached,
+        "llm.query_groq_cache_hit": measure(lambda: query_groq(prompt, system_message="bench", quiet=True), repeat),
+    }
+
+
+def rank_benchmarks(repeat, sizes=RANK_SIZES):
+    from sources.ranking import BM25Index, rank_articles
+
+    results = {}
+    for size in sizes:
+        articles = synthetic_articles(size)
+        results[f"rank.index.n{size}"] = measure(lambda: BM25Index().add(articles), repeat)
+        index = BM25Index()
+        index.add(articles)
+        results[f"rank.score.n{size}"] = measure(lambda: rank_articles(articles, "robotic surgery recall", index=index), repeat)
+    return results
+
+
+def synthetic_event_counts(entities, days=SURVEILLANCE_DAYS, seed=0):
+    """Long-format daily adverse event counts with Poisson noise and a few injected spikes"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", periods=days, freq="D")
+    names = [f"P{i:03d}" for i in range(entities)]
+    counts = rng.poisson(rng.uniform(0.5, 20.0, entities), (days, entities))
+    counts[rng.integers(days // 2, days, 5), rng.integers(0, entities, 5)] += 50
+    frame = pd.DataFrame({
+        "entity": np.tile(names, days),
+        "date": np.repeat(dates, entities),
+        "count": counts.ravel(),
+    })
+    return frame[frame["count"] > 0], dates[0], dates[-1], names
+
+
+def surveillance_benchmarks(repeat, sizes=SURVEILLANCE_WATCHLIST_SIZES):
+    from utils.surveillance import build_event_series, detect_spikes
+
+    results = {}
+    for size in sizes:
+        counts, start, end, names = synthetic_event_counts(size)
+        # The app passes datetime bounds with a time of day; no counts may be lost to misalignment
+        start, end = start.to_pydatetime().replace(hour=3, minute=27), end.to_pydatetime().replace(hour=15, minute=5)
+        for label, freq in (("daily", "D"), ("weekly", "W-MON")):
+            total = build_event_series(counts, freq, start, end, names).to_numpy().sum()
+            if total != counts["count"].sum():
+                raise AssertionError(f"surveillance.{label}.n{size}: series total {total} != {counts['count'].sum()}")
+            results[f"surveillance.{label}.n{size}"] = measure(
+                lambda: detect_spikes(build_event_series(counts, freq, start, end, names), freq=freq),
+                repeat
+            )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(latency_ms, jitter_ms, repeat, seed=0):
+    quiet_streamlit()
+    with StubServer(latency_ms=latency_ms, jitter_ms=jitter_ms, seed=seed) as stub:
+        point_sources_at(stub.base_url)
+        results = {}
+        results.update(parse_benchmarks(repeat))
+        results.update(fetch_benchmarks(repeat))
+        results.update(aggregate_benchmarks(repeat))
+        results.update(dedup_sort_benchmarks(repeat))
+        results.update(rank_benchmarks(repeat))
+        results.update(surveillance_benchmarks(repeat))
+        results.update(llm_benchmarks(repeat, latency_ms))
+        upstream_calls = stub.call_counts()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "repeat": repeat,
+            "upstream_calls": upstream_calls,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline):
+    """Print median change per benchmark relative to a baseline run"""
+    print(f"{'benchmark':36} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for name, stats in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:36} {'-':>12} {stats['median_ms']:12.3f} {'new':>9}")
+            continue
+        change = (stats["median_ms"] - base["median_ms"]) / base["median_ms"] * 100 if base["median_ms"] else 0.0
+        print(f"{name:36} {base['median_ms']:12.3f} {stats['median_ms']:12.3f} {change:+8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run offline Liberty_Extractor benchmarks")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stub server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter added to latency")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.latency_ms, args.jitter_ms, args.repeat, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
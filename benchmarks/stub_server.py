@@ -0,0 +1,152 @@
+"""Local stand-in for the upstream services, serving recorded fixtures.
+
+Every route replays a fixture from benchmarks/fixtures after an artificial
+delay of `latency_ms` +/- `jitter_ms`, and counts the calls it receives so
+benchmarks and load tests can report upstream usage.
+"""
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# (method, path prefix) -> (route name, fixture file, content type)
+ROUTES = [
+    ("GET", "/newsapi/", "newsapi", "newsapi.json", "application/json"),
+    ("GET", "/openfda/device/510k.json", "openfda_510k", "openfda_510k.json", "application/json"),
+    ("GET", "/openfda/device/pma.json", "openfda_pma", "openfda_510k.json", "application/json"),
+    ("GET", "/openfda/device/event.json", "openfda_event", "openfda_event.json", "application/json"),
+    ("GET", "/openfda/device/classification.json", "openfda_classification", "openfda_classification.json", "application/json"),
+    ("GET", "/rss/clinicaltrials", "clinical_trials_rss", "clinical_trials_rss.xml", "application/rss+xml"),
+    ("GET", "/rss/raps", "raps_rss", "raps_rss.xml", "application/rss+xml"),
+    ("GET", "/medtechdive/", "medtechdive", "medtechdive.html", "text/html; charset=utf-8"),
+    ("GET", "/fiercebiotech/", "fiercebiotech", "fiercebiotech.html", "text/html; charset=utf-8"),
+    ("POST", "/groq/", "groq", "groq_chat.json", "application/json"),
+]
+
+NOT_FOUND_BODY = b'{"error": {"code": "NOT_FOUND", "message": "No matches found!"}}'
+
+
+class StubServer:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, host="127.0.0.1", port=0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._fixtures = {}
+        for _, _, _, fixture, _ in ROUTES:
+            path = os.path.join(FIXTURES_DIR, fixture)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self._fixtures[fixture] = f.read()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _record(self, route):
+        with self._lock:
+            self.calls[route] += 1
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+
+    def call_counts(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self, method):
+                if method == "POST":
+                    # Drain the request body so keep-alive connections stay in sync
+                    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                path = urlsplit(self.path).path
+                for route_method, prefix, route, fixture, content_type in ROUTES:
+                    if route_method == method and path.startswith(prefix):
+                        stub._record(route)
+                        stub._delay()
+                        body = stub._fixtures.get(fixture)
+                        if body is None:
+                            return self._send(404, NOT_FOUND_BODY, "application/json")
+                        return self._send(200, body, content_type)
+                stub._record("unmatched")
+                self._send(404, NOT_FOUND_BODY, "application/json")
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def point_sources_at(base_url):
+    """Redirect every source and the Groq client to a stub server at base_url.
+
+    Secrets are replaced with dummy keys and the Groq rate limiter is lifted so
+    measurements reflect client overhead rather than throttling.
+    """
+    from sources import (
+        clinical_trials_rss, fiercebiotech_scraper, medtechdive_scraper,
+        newsapi_source, openfda_source, raps_rss,
+    )
+    from utils import groq_llm
+
+    newsapi_source.NEWSAPI_ENDPOINT = f"{base_url}/newsapi/v2/everything"
+    newsapi_source.get_newsapi_key = lambda: "benchmark-key"
+    openfda_source.OPENFDA_BASE_URL = f"{base_url}/openfda"
+    clinical_trials_rss.CLINICAL_TRIALS_FEED_URL = f"{base_url}/rss/clinicaltrials"
+    raps_rss.RAPS_FEED_URL = f"{base_url}/rss/raps"
+    medtechdive_scraper.MEDTECHDIVE_BASE_URL = f"{base_url}/medtechdive"
+    fiercebiotech_scraper.FIERCEBIOTECH_BASE_URL = f"{base_url}/fiercebiotech"
+    groq_llm.GROQ_ENDPOINT = f"{base_url}/groq/openai/v1/chat/completions"
+    groq_llm.get_groq_api_key = lambda: "benchmark-key"
+    groq_llm.rate_limiter = groq_llm.RateLimiter(10 ** 9)
+
+    from sources import registry
+    registry.has_secret = lambda path: True
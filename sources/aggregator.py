@@ -1,43 +1,65 @@
-from sources.newsapi_source import fetch_newsapi_articles
-from sources.medtechdive_scraper import fetch_medtechdive_articles
-from sources.clinical_trials_rss import fetch_clinical_trials_rss
-from sources.openfda_source import fetch_openfda_data, get_openfda_query_categories, get_queries_for_category
+from sources.registry import SOURCE_REGISTRY, load_source, get_unavailable_sources, source_has_capability
+from sources.ranking import BM25Index, rank_articles
+from utils.metrics import trace
 import streamlit as st
+from datetime import datetime, timezone
 
-def aggregate_articles(query="MedTech", max_results=10, sources=("newsapi", "fiercebiotech"), openfda_params=None):
+def aggregate_articles(query="MedTech", max_results=10, sources=("newsapi", "fiercebiotech"), openfda_params=None,
+                       relevance_weight=None):
+    """Fetch from each source, dedupe and order the results.
+
+    Results are newest first. With a relevance_weight, they are ranked by a
+    blend of BM25 relevance to `query` and recency instead (see sources.ranking).
+    """
     articles = []
+    index = BM25Index() if relevance_weight is not None else None
+
+    for name in sources:
+        fetcher = load_source(name)
+        if fetcher is None:
+            label = SOURCE_REGISTRY.get(name, {}).get("label", name)
+            st.warning(f"{label} unavailable: {get_unavailable_sources().get(name, 'unknown reason')}")
+            continue
+
+        if source_has_capability(name, "structured_query") and not openfda_params:
+            continue
+
+        with trace("fetch", source=name):
+            if source_has_capability(name, "structured_query"):
+                # OpenFDA integration
+                batch = fetcher(
+                    query_type=openfda_params.get("query_type"),
+                    query_name=openfda_params.get("query_name"),
+                    parameters=openfda_params.get("parameters", {}),
+                    max_results=max_results
+                )
+            elif source_has_capability(name, "keyword_search"):
+                batch = fetcher(query=query, max_results=max_results)
+            else:
+                batch = fetcher(max_results=max_results)
+        articles.extend(batch)
+        if index is not None:
+            with trace("index", source=name):
+                index.add(batch)
+
+    with trace("dedupe_sort"):
+        articles = sort_articles(dedupe_articles(articles))
+    if index is None:
+        return articles
+    with trace("rank"):
+        return rank_articles(articles, query, relevance_weight=relevance_weight, index=index)
 
-    # News sources
-    if "newsapi" in sources:
-        news_articles = fetch_newsapi_articles(query=query, max_results=max_results)
-        articles.extend(news_articles)
-
-    if "clinical_trials" in sources:
-        clinical_articles = fetch_clinical_trials_rss(max_results=max_results)
-        articles.extend(clinical_articles)
-
-    if "medtechdive" in sources:
-        medtech_articles = fetch_medtechdive_articles(max_results=max_results)
-        articles.extend(medtech_articles)
-
-    # OpenFDA integration
-    if "openfda" in sources and openfda_params:
-        openfda_articles = fetch_openfda_data(
-            query_type=openfda_params.get("query_type"),
-            query_name=openfda_params.get("query_name"),
-            parameters=openfda_params.get("parameters", {}),
-            max_results=max_results
-        )
-        articles.extend(openfda_articles)
-
-    # Deduplicate by title
+def dedupe_articles(articles):
+    """Deduplicate by title, keeping the first occurrence"""
     seen = set()
     deduped = []
     for a in articles:
-        if a["title"] not in seen:
+        if a.title not in seen:
             deduped.append(a)
-            seen.add(a["title"])
+            seen.add(a.title)
+    return deduped
 
-    # Sort by timestamp if available
-    deduped.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-    return deduped
\ No newline at end of file
+def sort_articles(articles):
+    """Newest first; articles without a timestamp go last"""
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(articles, key=lambda a: (a.timestamp is not None, a.timestamp or oldest), reverse=True)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def normalize_timestamp(value):
+    """Parse the timestamp formats our sources return into an aware UTC datetime.
+
+    Handles ISO 8601 (NewsAPI), RFC 822 (RSS feeds) and YYYYMMDD / YYYY-MM-DD
+    (OpenFDA). Returns None when the value is empty or unrecognised.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif not value:
+        return None
+    else:
+        text = str(value).strip()
+        parsed = None
+        if len(text) == 8 and text.isdigit():
+            try:
+                parsed = datetime.strptime(text, "%Y%m%d")
+            except ValueError:
+                return None
+        if parsed is None:
+            try:
+                parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+            except ValueError:
+                pass
+        if parsed is None:
+            try:
+                parsed = parsedate_to_datetime(text)
+            except (TypeError, ValueError):
+                return None
+
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class Article:
+    """A single search result from any source.
+
+    The raw upstream payload (an OpenFDA record, NewsAPI content string, ...)
+    is kept by reference in `raw`; text and JSON renderings of it are built
+    on demand so each result only holds one copy. Articles are not modified
+    after construction, so `key` is computed once and kept.
+    """
+
+    __slots__ = ("title", "summary", "source", "url", "timestamp", "raw", "endpoint", "query_type", "_key")
+
+    def __init__(self, title, summary="", source="", url="", timestamp=None, raw=None,
+                 endpoint=None, query_type=None):
+        self.title = title or ""
+        self.summary = summary or ""
+        self.source = source
+        self.url = url or ""
+        self.timestamp = normalize_timestamp(timestamp)
+        self.raw = raw
+        self.endpoint = endpoint
+        self.query_type = query_type
+        self._key = None
+
+    @property
+    def raw_text(self):
+        if self.raw is None:
+            return ""
+        if isinstance(self.raw, str):
+            return self.raw
+        return json.dumps(self.raw, default=str)
+
+    @property
+    def raw_json(self):
+        """Pretty-printed JSON for structured payloads, or None for text payloads"""
+        if self.raw is None or isinstance(self.raw, str):
+            return None
+        return json.dumps(self.raw, indent=2, default=str)
+
+    @property
+    def is_openfda(self):
+        return self.endpoint is not None
+
+    @property
+    def key(self):
+        """Stable identifier used to key caches and stores across sessions"""
+        if self._key is None:
+            ident = f"{self.source}\n{self.url}\n{self.title}"
+            if self.is_openfda:
+                ident += f"\n{self.raw_text}"
+            self._key = hashlib.sha1(ident.encode("utf-8")).hexdigest()
+        return self._key
+
+    @property
+    def display_title(self):
+        return f"{self.title} ({self.source})"
+
+    def __repr__(self):
+        return f"Article(title={self.title!r}, source={self.source!r})"
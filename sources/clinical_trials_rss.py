@@ -1,11 +1,28 @@
 import streamlit as st
 import feedparser
+import requests
+from sources.article import Article
+from utils.metrics import trace
+
+CLINICAL_TRIALS_FEED_URL = "https://clinicaltrials.gov/ct2/results/rss.xml?cond=medical+device&recrs=a"
 
 def fetch_clinical_trials_rss(max_results=5):
     st.sidebar.write("🧪 ClinicalTrials.gov RSS triggered")
 
-    feed_url = "https://clinicaltrials.gov/ct2/results/rss.xml?cond=medical+device&recrs=a"
-    feed = feedparser.parse(feed_url)
+    # Fetch with requests so the request has a timeout and can be traced
+    try:
+        with trace("http", source="clinical_trials") as span:
+            response = requests.get(CLINICAL_TRIALS_FEED_URL, timeout=10)
+            span.record_response(response)
+            response.raise_for_status()
+    except Exception as e:
+        st.error("ClinicalTrials.gov RSS failed.")
+        st.code(str(e))
+        return []
+
+    with trace("parse", source="clinical_trials"):
+        feed = feedparser.parse(response.content)
+        results = parse_clinical_trials_feed(feed, max_results)
 
     if st.sidebar.checkbox("Show RSS Feed Metadata"):
         st.expander("🧾 Feed Metadata").write({
@@ -15,6 +32,13 @@ def fetch_clinical_trials_rss(max_results=5):
             "Entries": len(feed.entries)
         })
 
+    if st.sidebar.checkbox("Show Matched Titles"):
+        st.expander("📰 Matched Titles").write([r.title for r in results])
+
+    return results
+
+def parse_clinical_trials_feed(feed, max_results=5):
+    """Turn parsed feed entries into Articles, skipping duplicate titles"""
     results = []
     seen_titles = set()
 
@@ -25,20 +49,16 @@ def fetch_clinical_trials_rss(max_results=5):
         published = entry.get("published", "")
 
         if title and title not in seen_titles:
-            results.append({
-                "title": title,
-                "summary": summary,
-                "source": "ClinicalTrials.gov RSS",
-                "url": link,
-                "raw_text": "",
-                "timestamp": published
-            })
+            results.append(Article(
+                title=title,
+                summary=summary,
+                source="ClinicalTrials.gov RSS",
+                url=link,
+                timestamp=published
+            ))
             seen_titles.add(title)
 
         if len(results) >= max_results:
             break
 
-    if st.sidebar.checkbox("Show Matched Titles"):
-        st.expander("📰 Matched Titles").write([r["title"] for r in results])
-
     return results
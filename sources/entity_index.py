@@ -0,0 +1,256 @@
+"""In-memory index of OpenFDA companies and product codes.
+
+Built once from OpenFDA device classification records and applicant /
+recalling-firm counts. A prefix trie powers autocomplete. difflib fuzzy
+matching maps misspelled or abbreviated company names onto the canonical
+applicant strings OpenFDA uses. Canonicalizing parameters before a query
+avoids the 404 -> broader search round trips.
+"""
+import bisect
+import difflib
+import re
+
+from sources.openfda_source import fetch_openfda_counts, iter_openfda_pages
+
+CLASSIFICATION_ENDPOINT = "/device/classification.json"
+CLASSIFICATION_MAX_RECORDS = 10000
+# (endpoint, count field) pairs that supply company names and how often they appear
+COMPANY_COUNT_FIELDS = (
+    ("/device/510k.json", "applicant.exact"),
+    ("/device/pma.json", "applicant.exact"),
+    ("/device/enforcement.json", "recalling_firm.exact"),
+)
+COMPANY_PARAMETERS = ("company_name", "competitor_name")
+PRODUCT_CODE_PARAMETERS = ("product_code",)
+SUGGESTION_LIMIT = 8
+FUZZY_CUTOFF = 0.8
+
+COMPANY_SUFFIXES = frozenset(
+    "inc incorporated llc ltd limited corp corporation co company plc gmbh ag sa nv bv spa srl lp usa".split()
+)
+PRODUCT_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+
+
+def normalize_company(name):
+    """Lowercase, '&' -> 'and', punctuation and legal suffixes dropped"""
+    words = re.findall(r"[a-z0-9]+", str(name).lower().replace("&", " and "))
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def normalize_text(text):
+    return " ".join(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+class PrefixTrie:
+    """Character trie whose nodes keep their top-weighted completions.
+
+    Every node stores the best `limit` values reachable below it, so a lookup
+    costs O(len(prefix)) regardless of how many entries share the prefix.
+    """
+
+    def __init__(self, limit=SUGGESTION_LIMIT):
+        self.limit = limit
+        self._root = {}
+
+    def insert(self, key, value, weight=0):
+        node = self._root
+        self._offer(node, value, weight)
+        for char in key:
+            node = node.setdefault(char, {})
+            self._offer(node, value, weight)
+        node[None] = True
+
+    def _offer(self, node, value, weight):
+        best = node.get("", [])
+        for i, (w, v) in enumerate(best):
+            if v == value:
+                if weight <= w:
+                    return
+                del best[i]
+                break
+        best.append((weight, value))
+        best.sort(key=lambda item: -item[0])
+        node[""] = best[:self.limit]
+
+    def _node(self, prefix):
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def complete(self, prefix):
+        node = self._node(prefix)
+        return [v for _, v in node.get("", [])] if node else []
+
+    def matches_word_prefix(self, prefix):
+        """True if some key equals `prefix` or continues it with a new word"""
+        node = self._node(prefix)
+        return node is not None and (None in node or " " in node)
+
+
+class EntityIndex:
+    """Canonical companies and product codes with autocomplete and fuzzy lookup"""
+
+    def __init__(self):
+        self.companies = {}       # normalized name -> (canonical applicant string, record count, its count)
+        self.product_codes = {}   # product code -> classification summary
+        self._company_trie = PrefixTrie()
+        self._product_trie = PrefixTrie()
+        self._device_names = {}   # normalized device name -> product code
+        self._name_words = {}     # word in a device name -> product codes
+        self._sorted_words = None
+        self.load_errors = []     # downloads that failed while building the index
+
+    def __len__(self):
+        return len(self.companies) + len(self.product_codes)
+
+    def add_company(self, name, count=1):
+        key = normalize_company(name)
+        if not key:
+            return
+        canonical, total, canonical_count = self.companies.get(key, (None, 0, 0))
+        # The most frequent raw spelling becomes the canonical one
+        if count > canonical_count:
+            canonical, canonical_count = name, count
+        total += count
+        self.companies[key] = (canonical, total, canonical_count)
+        self._company_trie.insert(key, key, total)
+
+    def add_classification(self, record):
+        code = (record.get("product_code") or "").upper()
+        if not code:
+            return
+        device_name = record.get("device_name") or ""
+        self.product_codes[code] = {
+            "device_name": device_name,
+            "device_class": record.get("device_class"),
+            "specialty": record.get("medical_specialty_description"),
+        }
+        self._product_trie.insert(code.lower(), code, 1)
+        name_key = normalize_text(device_name)
+        if name_key:
+            self._device_names[name_key] = code
+            self._product_trie.insert(name_key, code, 0)
+            for word in name_key.split(" "):
+                self._name_words.setdefault(word, set()).add(code)
+            self._sorted_words = None
+
+    def _codes_with_word_prefix(self, prefix):
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._name_words)
+        codes = set()
+        start = bisect.bisect_left(self._sorted_words, prefix)
+        for word in self._sorted_words[start:]:
+            if not word.startswith(prefix):
+                break
+            codes |= self._name_words[word]
+        return codes
+
+    def _match_device_words(self, key):
+        """Codes whose device name has a word starting with every query word, in any order.
+
+        "insulin pump" finds "Pump, Infusion, Insulin". Shorter, more specific
+        names come first.
+        """
+        codes = None
+        for token in key.split(" "):
+            matches = self._codes_with_word_prefix(token)
+            codes = matches if codes is None else codes & matches
+            if not codes:
+                return []
+        return sorted(codes, key=lambda c: (len(self.product_codes[c]["device_name"]), c))
+
+    def suggest_companies(self, text, limit=SUGGESTION_LIMIT):
+        key = normalize_company(text)
+        if not key:
+            return []
+        keys = self._company_trie.complete(key)
+        if len(keys) < limit:
+            keys += [k for k in difflib.get_close_matches(key, self.companies, n=limit, cutoff=FUZZY_CUTOFF) if k not in keys]
+        return [self.companies[k][0] for k in keys[:limit]]
+
+    def suggest_product_codes(self, text, limit=SUGGESTION_LIMIT):
+        key = normalize_text(text)
+        if not key:
+            return []
+        codes = self._product_trie.complete(key)
+        codes += [c for c in self._match_device_words(key) if c not in codes]
+        if len(codes) < limit:
+            for name in difflib.get_close_matches(key, self._device_names, n=limit, cutoff=FUZZY_CUTOFF):
+                if self._device_names[name] not in codes:
+                    codes.append(self._device_names[name])
+        return codes[:limit]
+
+    def describe_product_code(self, code):
+        info = self.product_codes.get(code)
+        if not info:
+            return code
+        return f"{code} — {info['device_name']} (Class {info['device_class']})"
+
+    def canonical_company(self, name):
+        """Return a company name OpenFDA will match, or the input if nothing better is known.
+
+        Names that already match an indexed company at a word boundary are kept
+        as typed, so "Medtronic" still covers every Medtronic entity. Otherwise
+        the best prefix completion or fuzzy match is used.
+        """
+        key = normalize_company(name)
+        if not key or not self.companies or self._company_trie.matches_word_prefix(key):
+            return name
+        suggestions = self.suggest_companies(name, limit=1)
+        return suggestions[0] if suggestions else name
+
+    def canonical_product_code(self, value):
+        """Map a product code or device name onto a valid product code, or return the input"""
+        code = value.strip().upper()
+        if code in self.product_codes or (not self.product_codes and PRODUCT_CODE_PATTERN.match(code)):
+            return code
+        suggestions = self.suggest_product_codes(value, limit=1)
+        return suggestions[0] if suggestions else value
+
+    def canonicalize_parameters(self, parameters):
+        """Return (canonical parameters, {name: (typed, canonical)} for every value that changed)"""
+        canonical = dict(parameters)
+        changes = {}
+        for name, value in parameters.items():
+            if not isinstance(value, str) or not value.strip():
+                continue
+            if name in COMPANY_PARAMETERS:
+                canonical[name] = self.canonical_company(value.strip())
+            elif name in PRODUCT_CODE_PARAMETERS:
+                canonical[name] = self.canonical_product_code(value)
+            if canonical[name].strip().lower() != value.strip().lower():
+                changes[name] = (value, canonical[name])
+        return canonical, changes
+
+
+def build_entity_index(max_classification_records=CLASSIFICATION_MAX_RECORDS):
+    """Download classification and company data from OpenFDA into a new EntityIndex.
+
+    A failing download leaves that part of the index empty and is listed in
+    `load_errors`. If nothing could be loaded at all, RuntimeError is raised
+    so that callers caching the index do not cache an empty one.
+    """
+    index = EntityIndex()
+    try:
+        for page in iter_openfda_pages(CLASSIFICATION_ENDPOINT, page_size=1000,
+                                       max_records=max_classification_records):
+            for record in page:
+                index.add_classification(record)
+    except Exception as e:
+        index.load_errors.append(f"{CLASSIFICATION_ENDPOINT}: {e}")
+    for endpoint, field in COMPANY_COUNT_FIELDS:
+        try:
+            for bucket in fetch_openfda_counts(endpoint, field):
+                index.add_company(bucket["term"], bucket["count"])
+        except Exception as e:
+            index.load_errors.append(f"{endpoint} count={field}: {e}")
+    if not len(index):
+        raise RuntimeError("OpenFDA entity index is empty: " + "; ".join(index.load_errors or ["no data returned"]))
+    return index
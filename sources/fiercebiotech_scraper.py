@@ -1,9 +1,13 @@
 import streamlit as st
 import requests
 from bs4 import BeautifulSoup
+from sources.article import Article
+from utils.metrics import trace
+
+FIERCEBIOTECH_BASE_URL = "https://www.fiercebiotech.com"
 
 def fetch_fiercebiotech_articles(max_results=5):
-    url = "https://www.fiercebiotech.com/"
+    url = f"{FIERCEBIOTECH_BASE_URL}/"
     headers = {
         "User-Agent": (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -13,30 +17,32 @@ def fetch_fiercebiotech_articles(max_results=5):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        print(response.status_code)  # Should be 200
-        print(response.text[:1000])  # Preview HTML
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        article_links = soup.select("h2.teaser-title a")[:max_results]
-
-        results = []
-        for a in article_links:
-            title = a.get_text(strip=True)
-            link = a["href"]
-            full_url = f"https://www.fiercebiotech.com{link}" if link.startswith("/") else link
-            results.append({
-                "title": title,
-                "summary": "Scraped from FierceBiotech homepage.",
-                "source": "FierceBiotech",
-                "url": full_url,
-                "raw_text": "",
-                "timestamp": ""
-            })
-        return results
+        with trace("http", source="fiercebiotech") as span:
+            response = requests.get(url, headers=headers, timeout=10)
+            span.record_response(response)
+            response.raise_for_status()
+        with trace("parse", source="fiercebiotech"):
+            return parse_fiercebiotech_html(response.text, max_results)
 
     except Exception as e:
         st.error("FierceBiotech scraping failed.")
         st.code(str(e))
         return []
+
+def parse_fiercebiotech_html(html, max_results=5):
+    soup = BeautifulSoup(html, "html.parser")
+
+    article_links = soup.select("h2.teaser-title a")[:max_results]
+
+    results = []
+    for a in article_links:
+        title = a.get_text(strip=True)
+        link = a["href"]
+        full_url = f"{FIERCEBIOTECH_BASE_URL}{link}" if link.startswith("/") else link
+        results.append(Article(
+            title=title,
+            summary="Scraped from FierceBiotech homepage.",
+            source="FierceBiotech",
+            url=full_url
+        ))
+    return results
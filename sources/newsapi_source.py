@@ -1,33 +1,44 @@
 import streamlit as st
 import requests
+from sources.article import Article
+from utils.metrics import trace
 
-NEWSAPI_KEY = st.secrets["newsapi"]["api_key"]
 NEWSAPI_ENDPOINT = "https://newsapi.org/v2/everything"
 
+def get_newsapi_key():
+    # Read lazily so a missing secret only affects this source, not the whole app
+    return st.secrets["newsapi"]["api_key"]
+
 def fetch_newsapi_articles(query="MedTech", max_results=10):
     params = {
         "q": query,
         "sortBy": "publishedAt",
         "language": "en",
-        "pageSize": max_results,
-        "apiKey": NEWSAPI_KEY
+        "pageSize": max_results
     }
     try:
-        response = requests.get(NEWSAPI_ENDPOINT, params=params)
-        response.raise_for_status()
-        articles = response.json().get("articles", [])
-        return [
-            {
-                "title": a["title"],
-                "summary": a["description"],
-                "source": "NewsAPI",
-                "url": a["url"],
-                "raw_text": a.get("content", ""),
-                "timestamp": a.get("publishedAt", "")
-            }
-            for a in articles
-        ]
+        params["apiKey"] = get_newsapi_key()
+        with trace("http", source="newsapi") as span:
+            response = requests.get(NEWSAPI_ENDPOINT, params=params)
+            span.record_response(response)
+            response.raise_for_status()
+        with trace("parse", source="newsapi"):
+            return parse_newsapi_response(response.json())
     except Exception as e:
         st.error("NewsAPI failed.")
         st.code(str(e))
         return []
+
+def parse_newsapi_response(data):
+    articles = data.get("articles", [])
+    return [
+        Article(
+            title=a["title"],
+            summary=a["description"],
+            source="NewsAPI",
+            url=a["url"],
+            timestamp=a.get("publishedAt", ""),
+            raw=a.get("content", "")
+        )
+        for a in articles
+    ]
@@ -2,8 +2,11 @@ import streamlit as st
 import requests
 from datetime import datetime, timedelta
 import urllib.parse
+from sources.article import Article
+from utils.metrics import trace
 
 OPENFDA_BASE_URL = "https://api.fda.gov"
+OPENFDA_MAX_SKIP = 25000
 
 # Predefined queries for different use cases with default values
 OPENFDA_QUERIES = {
@@ -129,18 +132,88 @@ def sanitize_company_name(company_name):
     # For other companies, replace spaces with +
     return sanitized.replace(' ', '+')
 
+def find_openfda_query(query_name):
+    """Return the predefined query configuration with the given name, or None"""
+    for category in OPENFDA_QUERIES.values():
+        for query in category:
+            if query["name"] == query_name:
+                return query
+    return None
+
+def validate_openfda_parameters(selected_query, parameters):
+    """Sanitize user parameters, falling back to query defaults or a wildcard"""
+    validated_parameters = {}
+    for param_name, param_value in parameters.items():
+        if param_value and param_value.strip():  # Only include non-empty parameters
+            # Sanitize company names
+            if param_name in ['company_name', 'competitor_name']:
+                validated_parameters[param_name] = sanitize_company_name(param_value.strip())
+            else:
+                validated_parameters[param_name] = param_value.strip()
+        else:
+            # Use default if available
+            if selected_query.get('defaults') and param_name in selected_query['defaults']:
+                default_value = selected_query['defaults'][param_name]
+                if param_name in ['company_name', 'competitor_name']:
+                    validated_parameters[param_name] = sanitize_company_name(default_value)
+                else:
+                    validated_parameters[param_name] = default_value
+            else:
+                st.warning(f"Parameter '{param_name}' is empty. Using wildcard search.")
+                validated_parameters[param_name] = "*"
+    return validated_parameters
+
+def iter_openfda_pages(endpoint, query_string="", page_size=100, max_records=1000, timeout=30):
+    """Yield successive pages of raw OpenFDA results using limit/skip pagination.
+
+    OpenFDA caps `limit` at 1000 and `skip` at 25000; a 404 means no matches.
+    """
+    page_size = min(page_size, 1000)
+    fetched = 0
+    while fetched < max_records and fetched <= OPENFDA_MAX_SKIP:
+        limit = min(page_size, max_records - fetched)
+        url = f"{OPENFDA_BASE_URL}{endpoint}?"
+        if query_string:
+            url += f"{query_string}&"
+        url += f"limit={limit}&skip={fetched}"
+        with trace("http", source="openfda", endpoint=endpoint) as span:
+            response = requests.get(url, timeout=timeout)
+            span.record_response(response)
+        if response.status_code == 404:
+            return
+        response.raise_for_status()
+        page = response.json().get("results", [])
+        if not page:
+            return
+        yield page
+        fetched += len(page)
+        if len(page) < limit:
+            return
+
+def fetch_openfda_counts(endpoint, field, query_string="", limit=1000, timeout=30):
+    """Return OpenFDA `count=` buckets as a list of dicts.
+
+    Buckets are {"term", "count"}, most frequent first, or {"time", "count"}
+    in date order when counting a date field. OpenFDA returns at most 1000
+    buckets; a 404 means no matches.
+    """
+    url = f"{OPENFDA_BASE_URL}{endpoint}?"
+    if query_string:
+        url += f"{query_string}&"
+    url += f"count={field}&limit={min(limit, 1000)}"
+    with trace("http", source="openfda", endpoint=endpoint) as span:
+        response = requests.get(url, timeout=timeout)
+        span.record_response(response)
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    return [b for b in response.json().get("results", []) if "count" in b and ("term" in b or "time" in b)]
+
 def fetch_openfda_data(query_type, query_name, parameters, max_results=10):
     """Fetch data from OpenFDA API based on predefined queries"""
     
     # Find the selected query configuration
-    selected_query = None
-    for category in OPENFDA_QUERIES.values():
-        for query in category:
-            if query["name"] == query_name:
-                selected_query = query
-                break
-        if selected_query:
-            break
+    selected_query = find_openfda_query(query_name)
     
     if not selected_query:
         st.error(f"Query configuration not found: {query_name}")
@@ -148,25 +221,7 @@ def fetch_openfda_data(query_type, query_name, parameters, max_results=10):
     
     try:
         # Validate and sanitize parameters
-        validated_parameters = {}
-        for param_name, param_value in parameters.items():
-            if param_value and param_value.strip():  # Only include non-empty parameters
-                # Sanitize company names
-                if param_name in ['company_name', 'competitor_name']:
-                    validated_parameters[param_name] = sanitize_company_name(param_value.strip())
-                else:
-                    validated_parameters[param_name] = param_value.strip()
-            else:
-                # Use default if available
-                if selected_query.get('defaults') and param_name in selected_query['defaults']:
-                    default_value = selected_query['defaults'][param_name]
-                    if param_name in ['company_name', 'competitor_name']:
-                        validated_parameters[param_name] = sanitize_company_name(default_value)
-                    else:
-                        validated_parameters[param_name] = default_value
-                else:
-                    st.warning(f"Parameter '{param_name}' is empty. Using wildcard search.")
-                    validated_parameters[param_name] = "*"
+        validated_parameters = validate_openfda_parameters(selected_query, parameters)
         
         # Build the query string
         query_string = selected_query["query_template"].format(**validated_parameters)
@@ -175,7 +230,9 @@ def fetch_openfda_data(query_type, query_name, parameters, max_results=10):
         st.sidebar.write(f"🔍 OpenFDA Query: {query_name}")
         st.sidebar.write(f"📊 Using parameters: {validated_parameters}")
         
-        response = requests.get(url, timeout=30)
+        with trace("http", source="openfda", endpoint=selected_query["endpoint"]) as span:
+            response = requests.get(url, timeout=30)
+            span.record_response(response)
         
         if response.status_code == 404:
             # No results found - try a broader search
@@ -183,27 +240,14 @@ def fetch_openfda_data(query_type, query_name, parameters, max_results=10):
             return try_broader_search(selected_query, validated_parameters, max_results)
             
         response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        for item in data.get("results", []):
-            # Extract relevant information based on endpoint
-            title = extract_title(item, selected_query["endpoint"])
-            summary = extract_summary(item, selected_query["endpoint"])
-            
-            results.append({
-                "title": title,
-                "summary": summary,
-                "source": f"OpenFDA - {query_name}",
-                "url": construct_openfda_url(selected_query["endpoint"], item),
-                "raw_text": str(item),
-                "timestamp": extract_timestamp(item, selected_query["endpoint"]),
-                "metadata": {
-                    "endpoint": selected_query["endpoint"],
-                    "query_type": query_type,
-                    "raw_data": item
-                }
-            })
+        with trace("parse", source="openfda", endpoint=selected_query["endpoint"]):
+            data = response.json()
+            results = parse_openfda_results(
+                data.get("results", []),
+                selected_query["endpoint"],
+                source=f"OpenFDA - {query_name}",
+                query_type=query_type
+            )
         
         if not results:
             st.info("No results found for this query. Try adjusting your search parameters.")
@@ -244,40 +288,52 @@ def try_broader_search(selected_query, parameters, max_results):
         broader_urls.append(("Recent PMAs", recent_url))
     
     results = []
-    for search_type, url in broader_urls:
-        try:
-            st.sidebar.write(f"Trying {search_type}...")
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                
-                for item in data.get("results", []):
-                    title = extract_title(item, selected_query["endpoint"])
-                    summary = extract_summary(item, selected_query["endpoint"])
+    with trace("broader_search", source="openfda", endpoint=selected_query["endpoint"]) as search_span:
+        for attempt, (search_type, url) in enumerate(broader_urls):
+            # Each fallback URL after the first counts as a retry of the original query
+            search_span.retries = attempt
+            try:
+                st.sidebar.write(f"Trying {search_type}...")
+                with trace("http", source="openfda", endpoint=selected_query["endpoint"]) as span:
+                    response = requests.get(url, timeout=30)
+                    span.record_response(response)
+                if response.status_code == 200:
+                    with trace("parse", source="openfda", endpoint=selected_query["endpoint"]):
+                        data = response.json()
+                        results.extend(parse_openfda_results(
+                            data.get("results", []),
+                            selected_query["endpoint"],
+                            source=f"OpenFDA - {selected_query['name']}",
+                            query_type="Broader Search",
+                            title_prefix=f"{search_type}: "
+                        ))
                     
-                    results.append({
-                        "title": f"{search_type}: {title}",
-                        "summary": summary,
-                        "source": f"OpenFDA - {selected_query['name']}",
-                        "url": construct_openfda_url(selected_query["endpoint"], item),
-                        "raw_text": str(item),
-                        "timestamp": extract_timestamp(item, selected_query["endpoint"]),
-                        "metadata": {
-                            "endpoint": selected_query["endpoint"],
-                            "query_type": "Broader Search",
-                            "raw_data": item
-                        }
-                    })
-                
-                if results:
-                    st.success(f"Found {len(results)} results using {search_type}")
-                    break
-                
-        except Exception as e:
-            continue
+                    if results:
+                        st.success(f"Found {len(results)} results using {search_type}")
+                        break
+                    
+            except Exception as e:
+                continue
     
     return results
 
+def parse_openfda_results(items, endpoint, source, query_type, title_prefix=""):
+    """Convert raw OpenFDA records into Articles"""
+    results = []
+    for item in items:
+        # Extract relevant information based on endpoint
+        results.append(Article(
+            title=f"{title_prefix}{extract_title(item, endpoint)}",
+            summary=extract_summary(item, endpoint),
+            source=source,
+            url=construct_openfda_url(endpoint, item),
+            timestamp=extract_timestamp(item, endpoint),
+            raw=item,
+            endpoint=endpoint,
+            query_type=query_type
+        ))
+    return results
+
 def extract_title(item, endpoint):
     """Extract title based on endpoint type"""
     if "510k" in endpoint:
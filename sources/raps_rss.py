@@ -1,11 +1,28 @@
 import streamlit as st
 import feedparser
+import requests
+from sources.article import Article
+from utils.metrics import trace
+
+RAPS_FEED_URL = "https://www.raps.org/rss-feeds/news-articles"
 
 def fetch_raps_rss(max_results=5):
     st.sidebar.write("🧪 RAPS RSS scraper triggered")
 
-    feed_url = "https://www.raps.org/rss-feeds/news-articles"
-    feed = feedparser.parse(feed_url)
+    # Fetch with requests so the request has a timeout and can be traced
+    try:
+        with trace("http", source="raps_rss") as span:
+            response = requests.get(RAPS_FEED_URL, timeout=10)
+            span.record_response(response)
+            response.raise_for_status()
+    except Exception as e:
+        st.error("RAPS RSS failed.")
+        st.code(str(e))
+        return []
+
+    with trace("parse", source="raps_rss"):
+        feed = feedparser.parse(response.content)
+        results = parse_raps_feed(feed, max_results)
 
     if st.sidebar.checkbox("Show RSS Feed Metadata"):
         st.expander("🧾 Feed Metadata").write({
@@ -15,6 +32,13 @@ def fetch_raps_rss(max_results=5):
             "Entries": len(feed.entries)
         })
 
+    if st.sidebar.checkbox("Show Matched Titles"):
+        st.expander("📰 Matched Titles").write([r.title for r in results])
+
+    return results
+
+def parse_raps_feed(feed, max_results=5):
+    """Turn parsed feed entries into Articles, skipping duplicate titles"""
     results = []
     seen_titles = set()
 
@@ -25,20 +49,16 @@ def fetch_raps_rss(max_results=5):
         published = entry.get("published", "")
 
         if title and title not in seen_titles:
-            results.append({
-                "title": title,
-                "summary": summary,
-                "source": "RAPS RSS",
-                "url": link,
-                "raw_text": "",
-                "timestamp": published
-            })
+            results.append(Article(
+                title=title,
+                summary=summary,
+                source="RAPS RSS",
+                url=link,
+                timestamp=published
+            ))
             seen_titles.add(title)
 
         if len(results) >= max_results:
             break
 
-    if st.sidebar.checkbox("Show Matched Titles"):
-        st.expander("📰 Matched Titles").write([r["title"] for r in results])
-
     return results
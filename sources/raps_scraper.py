@@ -1,5 +1,6 @@
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
+from sources.article import Article
 import streamlit as st
 
 def fetch_raps_articles(max_results=5):
@@ -22,17 +23,15 @@ def fetch_raps_articles(max_results=5):
             title = a.get_text(strip=True)
             href = a["href"]
             full_url = f"https://www.raps.org{href}" if href.startswith("/") else href
-            results.append({
-                "title": title,
-                "summary": "Scraped from RAPS homepage via Playwright.",
-                "source": "RAPS",
-                "url": full_url,
-                "raw_text": "",
-                "timestamp": ""
-            })
+            results.append(Article(
+                title=title,
+                summary="Scraped from RAPS homepage via Playwright.",
+                source="RAPS",
+                url=full_url
+            ))
 
         if st.sidebar.checkbox("Show Matched Titles"):
-            st.expander("📰 Matched Titles").write([r["title"] for r in results])
+            st.expander("📰 Matched Titles").write([r.title for r in results])
 
         return results
 
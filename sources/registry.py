@@ -0,0 +1,136 @@
+import importlib
+import threading
+
+import streamlit as st
+
+# Each source declares where its fetcher lives, what it can do and which
+# secrets it needs. Modules are only imported the first time a source is used.
+SOURCE_REGISTRY = {
+    "newsapi": {
+        "label": "NewsAPI",
+        "module": "sources.newsapi_source",
+        "function": "fetch_newsapi_articles",
+        "capabilities": ("keyword_search",),
+        "secrets": ("newsapi.api_key",),
+    },
+    "clinical_trials": {
+        "label": "ClinicalTrials.gov RSS",
+        "module": "sources.clinical_trials_rss",
+        "function": "fetch_clinical_trials_rss",
+        "capabilities": ("feed",),
+        "secrets": (),
+    },
+    "medtechdive": {
+        "label": "MedTechDive",
+        "module": "sources.medtechdive_scraper",
+        "function": "fetch_medtechdive_articles",
+        "capabilities": ("scrape",),
+        "secrets": (),
+    },
+    "fiercebiotech": {
+        "label": "FierceBiotech",
+        "module": "sources.fiercebiotech_scraper",
+        "function": "fetch_fiercebiotech_articles",
+        "capabilities": ("scrape",),
+        "secrets": (),
+    },
+    "raps_rss": {
+        "label": "RAPS RSS",
+        "module": "sources.raps_rss",
+        "function": "fetch_raps_rss",
+        "capabilities": ("feed",),
+        "secrets": (),
+    },
+    "raps": {
+        "label": "RAPS",
+        "module": "sources.raps_scraper",
+        "function": "fetch_raps_articles",
+        "capabilities": ("scrape", "browser"),
+        "secrets": (),
+    },
+    "openfda": {
+        "label": "OpenFDA",
+        "module": "sources.openfda_source",
+        "function": "fetch_openfda_data",
+        "capabilities": ("structured_query",),
+        "secrets": (),
+    },
+}
+
+_fetchers = {}
+_import_errors = {}
+_unavailable = {}
+_lock = threading.Lock()
+
+
+def has_secret(path):
+    """Check whether a dotted secret path (e.g. 'newsapi.api_key') is configured"""
+    section, _, key = path.partition(".")
+    try:
+        return key in st.secrets[section]
+    except Exception:
+        return False
+
+
+def missing_secrets(name):
+    """Return the secrets a source needs that are not configured"""
+    spec = SOURCE_REGISTRY.get(name, {})
+    return [path for path in spec.get("secrets", ()) if not has_secret(path)]
+
+
+def list_sources(capability=None):
+    """Return registered source names, optionally filtered by capability"""
+    return [
+        name for name, spec in SOURCE_REGISTRY.items()
+        if capability is None or capability in spec["capabilities"]
+    ]
+
+
+def source_has_capability(name, capability):
+    return capability in SOURCE_REGISTRY.get(name, {}).get("capabilities", ())
+
+
+def load_source(name):
+    """Import a source on first use and return its fetcher, or None if unavailable.
+
+    Failures are recorded and can be read back with get_unavailable_sources();
+    they never propagate to the caller.
+    """
+    spec = SOURCE_REGISTRY.get(name)
+    if spec is None:
+        _unavailable[name] = "Unknown source"
+        return None
+
+    missing = missing_secrets(name)
+    if missing:
+        _unavailable[name] = f"Missing secrets: {', '.join(missing)}"
+        return None
+
+    with _lock:
+        if name in _fetchers:
+            _unavailable.pop(name, None)
+            return _fetchers[name]
+        # Failed imports are remembered so a broken dependency is not retried on every rerun
+        if name in _import_errors:
+            _unavailable[name] = _import_errors[name]
+            return None
+        try:
+            module = importlib.import_module(spec["module"])
+            fetcher = getattr(module, spec["function"])
+        except Exception as e:
+            _import_errors[name] = f"Import failed: {e}"
+            _unavailable[name] = _import_errors[name]
+            return None
+        _fetchers[name] = fetcher
+        _unavailable.pop(name, None)
+        return fetcher
+
+
+def get_unavailable_sources():
+    """Return {source name: reason} for sources that could not be loaded"""
+    return dict(_unavailable)
+
+
+def get_loaded_sources():
+    """Return the names of sources whose modules have been imported"""
+    return list(_fetchers)
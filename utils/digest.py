@@ -0,0 +1,124 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.groq_llm import query_groq
+
+# llama-3.1-8b-instant has a large context window, but Groq's per-minute token
+# limits make small chunks the practical unit of work.
+CHUNK_TOKEN_BUDGET = 3000
+SUMMARY_MAX_TOKENS = 400
+ITEM_MAX_CHARS = 2000
+MAX_WORKERS = 4
+
+MAP_SYSTEM_MESSAGE = (
+    "You summarize batches of MedTech news and FDA regulatory records for sales and "
+    "regulatory teams. Be factual and concise; keep company names, device names, "
+    "product codes and dates."
+)
+REDUCE_SYSTEM_MESSAGE = (
+    "You merge partial MedTech intelligence summaries into one briefing. Remove "
+    "duplication, group related items and keep the most important facts."
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def article_digest_text(article, max_chars=ITEM_MAX_CHARS):
+    date = article.timestamp.strftime("%Y-%m-%d") if article.timestamp else "undated"
+    text = f"- [{article.source}, {date}] {article.title}: {article.summary}"
+    if article.is_openfda and article.raw_text:
+        text += f"\n  Data: {article.raw_text}"
+    return text[:max_chars]
+
+
+def _is_boundary(text, boundary_every):
+    # Content-defined boundary: whether a chunk ends after this item depends only
+    # on the item itself, so inserting new items leaves other chunks unchanged.
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % boundary_every == 0
+
+
+def chunk_texts(texts, token_budget=CHUNK_TOKEN_BUDGET, boundary_every=8):
+    """Split texts into chunks that fit the token budget, with stable boundaries"""
+    chunks = []
+    current, current_tokens = [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+        if _is_boundary(text, boundary_every):
+            chunks.append(current)
+            current, current_tokens = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_articles(articles, token_budget=CHUNK_TOKEN_BUDGET):
+    """Chunk articles in a stable order (by article key) so existing chunks survive new arrivals"""
+    ordered = sorted(articles, key=lambda a: a.key)
+    return chunk_texts([article_digest_text(a) for a in ordered], token_budget)
+
+
+def summarize_chunk(texts, focus, system_message):
+    # Deterministic prompts mean unchanged chunks are served from the LLM cache
+    prompt = f"FOCUS: {focus}\n\nITEMS:\n" + "\n".join(texts) + "\n\nSummarize the items above."
+    return query_groq(
+        prompt,
+        system_message=system_message,
+        temperature=0,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        quiet=True
+    )
+
+
+def summarize_chunks(chunks, focus, system_message, max_workers=MAX_WORKERS):
+    """Summarize chunks in parallel; Groq's shared rate limiter throttles the workers"""
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        summaries = list(pool.map(lambda chunk: summarize_chunk(chunk, focus, system_message), chunks))
+    return [s for s in summaries if s]
+
+
+def build_digest(articles, focus="Key regulatory, clinical and competitive developments",
+                 token_budget=CHUNK_TOKEN_BUDGET, max_workers=MAX_WORKERS):
+    """Map-reduce summarization of a large result set into a single digest.
+
+    Articles are chunked by token budget and summarized in parallel (map), then
+    the summaries are merged level by level (reduce) until one remains. Returns
+    a dict with the digest text and tree statistics, or None if nothing could
+    be summarized.
+    """
+    if not articles:
+        return None
+
+    chunks = chunk_articles(articles, token_budget)
+    summaries = summarize_chunks(chunks, focus, MAP_SYSTEM_MESSAGE, max_workers)
+    map_chunks = len(chunks)
+    failed = map_chunks - len(summaries)
+    levels = 1
+
+    while len(summaries) > 1:
+        groups = chunk_texts(summaries, token_budget, boundary_every=4)
+        if len(groups) == len(summaries):
+            # Every summary formed its own group; force pairwise merging to guarantee progress
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+        summaries = summarize_chunks(groups, focus, REDUCE_SYSTEM_MESSAGE, max_workers)
+        levels += 1
+
+    if not summaries:
+        return None
+    return {
+        "digest": summaries[0],
+        "articles": len(articles),
+        "chunks": map_chunks,
+        "failed_chunks": failed,
+        "levels": levels,
+    }
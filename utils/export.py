@@ -0,0 +1,261 @@
+import io
+import json
+import os
+import urllib.parse
+import uuid
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sources.article import normalize_timestamp
+from sources.openfda_source import extract_timestamp, find_openfda_query, iter_openfda_pages, validate_openfda_parameters
+
+# Flattened OpenFDA fields exported per endpoint. Dotted paths walk nested
+# objects and lists of objects; keeping the list fixed keeps the schema stable
+# across pages so every page can be appended as a row group.
+OPENFDA_EXPORT_FIELDS = {
+    "/device/510k.json": [
+        "k_number", "applicant", "device_name", "product_code", "decision_date",
+        "decision_description", "clearance_type", "date_received", "advisory_committee_description",
+        "country_code", "openfda.device_class", "openfda.regulation_number",
+        "openfda.medical_specialty_description",
+    ],
+    "/device/pma.json": [
+        "pma_number", "supplement_number", "applicant", "trade_name", "generic_name",
+        "product_code", "decision_date", "decision_code", "date_received",
+        "advisory_committee_description", "openfda.device_class", "openfda.regulation_number",
+    ],
+    "/device/event.json": [
+        "mdr_report_key", "report_number", "event_type", "date_received", "date_of_event",
+        "product_problems", "adverse_event_flag", "product_problem_flag", "source_type",
+        "device.brand_name", "device.generic_name", "device.manufacturer_d_name",
+        "device.device_report_product_code", "mdr_text.text",
+    ],
+    "/device/enforcement.json": [
+        "recall_number", "event_id", "status", "classification", "recalling_firm",
+        "product_description", "reason_for_recall", "recall_initiation_date", "report_date",
+        "distribution_pattern", "product_quantity", "state", "country",
+    ],
+    "/device/classification.json": [
+        "product_code", "device_name", "device_class", "regulation_number",
+        "medical_specialty_description", "review_panel", "submission_type_id",
+        "implant_flag", "life_sustain_support_flag", "definition",
+    ],
+}
+
+# Month partitions keep decades-long pulls to a few hundred files
+PARTITION_COLUMNS = ("source", "month")
+MAX_OPEN_WRITERS = 64
+# Exports are only written below this directory
+EXPORT_ROOT = os.environ.get("LIBERTY_EXPORT_ROOT", "exports")
+
+ARTICLE_SCHEMA = pa.schema([
+    ("key", pa.string()),
+    ("title", pa.string()),
+    ("summary", pa.string()),
+    ("url", pa.string()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("endpoint", pa.string()),
+    ("query_type", pa.string()),
+    ("raw_text", pa.string()),
+    ("source", pa.string()),
+    ("month", pa.string()),
+])
+
+
+def column_name(path):
+    return path.replace(".", "_")
+
+
+def get_field(item, path):
+    """Resolve a dotted path in an OpenFDA record into a flat string value.
+
+    Lists of objects are expanded, and multiple values are joined with '; '.
+    """
+    values = [item]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                value_items = value
+            else:
+                value_items = [value]
+            for v in value_items:
+                if isinstance(v, dict) and part in v:
+                    next_values.append(v[part])
+        values = next_values
+        if not values:
+            return None
+
+    flat = []
+    for value in values:
+        for v in (value if isinstance(value, list) else [value]):
+            if v is None or v == "":
+                continue
+            flat.append(json.dumps(v, default=str) if isinstance(v, dict) else str(v))
+    return "; ".join(dict.fromkeys(flat)) if flat else None
+
+
+def openfda_schema(endpoint):
+    fields = OPENFDA_EXPORT_FIELDS.get(endpoint)
+    columns = [(column_name(f), pa.string()) for f in fields] if fields else [("record_json", pa.string())]
+    return pa.schema(columns + [
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("endpoint", pa.string()),
+        ("source", pa.string()),
+        ("month", pa.string()),
+    ])
+
+
+def openfda_records_to_table(records, endpoint, source):
+    """Flatten a page of raw OpenFDA records into an Arrow table"""
+    schema = openfda_schema(endpoint)
+    fields = OPENFDA_EXPORT_FIELDS.get(endpoint)
+    columns = {name: [] for name in schema.names}
+    for item in records:
+        if fields:
+            for f in fields:
+                columns[column_name(f)].append(get_field(item, f))
+        else:
+            columns["record_json"].append(json.dumps(item, default=str))
+        timestamp = normalize_timestamp(extract_timestamp(item, endpoint))
+        columns["timestamp"].append(timestamp)
+        columns["endpoint"].append(endpoint)
+        columns["source"].append(source)
+        columns["month"].append(partition_month(timestamp))
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def articles_to_table(articles):
+    """Convert Article objects (e.g. from aggregate_articles) into an Arrow table"""
+    columns = {name: [] for name in ARTICLE_SCHEMA.names}
+    for a in articles:
+        columns["key"].append(a.key)
+        columns["title"].append(a.title)
+        columns["summary"].append(a.summary)
+        columns["url"].append(a.url)
+        columns["timestamp"].append(a.timestamp)
+        columns["endpoint"].append(a.endpoint)
+        columns["query_type"].append(a.query_type)
+        columns["raw_text"].append(a.raw_text)
+        columns["source"].append(a.source)
+        columns["month"].append(partition_month(a.timestamp))
+    return pa.Table.from_pydict(columns, schema=ARTICLE_SCHEMA)
+
+
+def partition_month(timestamp):
+    return timestamp.strftime("%Y-%m") if timestamp else "unknown"
+
+
+def resolve_export_dir(subdir=""):
+    """Resolve a user-supplied subdirectory of EXPORT_ROOT, refusing paths that escape it"""
+    root = os.path.realpath(EXPORT_ROOT)
+    path = os.path.realpath(os.path.join(root, subdir.strip()))
+    if os.path.isabs(subdir.strip()) or os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Export directory must be inside {EXPORT_ROOT}/")
+    return path
+
+
+class PartitionedParquetWriter:
+    """Write Arrow tables into a hive-partitioned Parquet tree (source=.../month=...)
+
+    Each partition keeps an open ParquetWriter, and every write_table call
+    appends a row group, so callers can stream pages without holding the full
+    result set in memory. At most `max_open_writers` files are open at once;
+    the least recently used one is closed, and a partition written to again
+    afterwards gets a new part file.
+    """
+
+    def __init__(self, root_dir, schema, partition_columns=PARTITION_COLUMNS, file_name=None,
+                 max_open_writers=MAX_OPEN_WRITERS):
+        self.root_dir = root_dir
+        self.partition_columns = tuple(partition_columns)
+        self.file_schema = pa.schema([f for f in schema if f.name not in self.partition_columns])
+        # A unique file per writer lets repeated exports share one root directory
+        self.file_name = file_name or f"part-{uuid.uuid4().hex}.parquet"
+        self.max_open_writers = max_open_writers
+        self.rows_written = 0
+        self._writers = OrderedDict()
+        self._reopened = {}
+
+    def _writer_for(self, values):
+        writer = self._writers.get(values)
+        if writer is not None:
+            self._writers.move_to_end(values)
+            return writer
+        if len(self._writers) >= self.max_open_writers:
+            _, oldest = self._writers.popitem(last=False)
+            oldest.close()
+        parts = [
+            f"{col}={urllib.parse.quote(str(value), safe='')}"
+            for col, value in zip(self.partition_columns, values)
+        ]
+        directory = os.path.join(self.root_dir, *parts)
+        os.makedirs(directory, exist_ok=True)
+        file_name = self.file_name
+        reopened = self._reopened.get(values, 0)
+        if reopened:
+            stem, ext = os.path.splitext(file_name)
+            file_name = f"{stem}-{reopened}{ext}"
+        self._reopened[values] = reopened + 1
+        writer = self._writers[values] = pq.ParquetWriter(os.path.join(directory, file_name), self.file_schema)
+        return writer
+
+    def write_table(self, table):
+        if table.num_rows == 0:
+            return
+        keys = list(zip(*(table.column(col).to_pylist() for col in self.partition_columns)))
+        groups = {}
+        for index, key in enumerate(keys):
+            groups.setdefault(key, []).append(index)
+        data = table.drop_columns(list(self.partition_columns))
+        for key, indices in groups.items():
+            self._writer_for(key).write_table(data.take(indices))
+        self.rows_written += table.num_rows
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_articles_parquet(articles, root_dir):
+    """Write aggregated articles to a Parquet tree partitioned by source and date"""
+    with PartitionedParquetWriter(root_dir, ARTICLE_SCHEMA) as writer:
+        writer.write_table(articles_to_table(articles))
+    return writer.rows_written
+
+
+def articles_to_parquet_bytes(articles):
+    """Serialize articles into a single in-memory Parquet file (for downloads)"""
+    buffer = io.BytesIO()
+    pq.write_table(articles_to_table(articles), buffer)
+    return buffer.getvalue()
+
+
+def export_openfda_query(query_name, parameters, root_dir, page_size=1000, max_records=10000):
+    """Stream a paginated OpenFDA pull for a predefined query into partitioned Parquet.
+
+    Only one page of records is held in memory at a time. Returns the number
+    of rows written.
+    """
+    selected_query = find_openfda_query(query_name)
+    if not selected_query:
+        raise ValueError(f"Query configuration not found: {query_name}")
+
+    validated_parameters = validate_openfda_parameters(selected_query, parameters)
+    query_string = selected_query["query_template"].format(**validated_parameters)
+    endpoint = selected_query["endpoint"]
+    source = f"OpenFDA - {query_name}"
+
+    with PartitionedParquetWriter(root_dir, openfda_schema(endpoint)) as writer:
+        for page in iter_openfda_pages(endpoint, query_string, page_size=page_size, max_records=max_records):
+            writer.write_table(openfda_records_to_table(page, endpoint, source))
+    return writer.rows_written
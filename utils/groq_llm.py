@@ -1,17 +1,67 @@
 import streamlit as st
 import requests
 import time
+import hashlib
+import json
+import threading
+from cachetools import LRUCache
+from utils.metrics import trace, record_cache_lookup, record_groq_usage
 
-GROQ_API_KEY = st.secrets["groq"]["api_key"]
 GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_MODEL = "llama-3.1-8b-instant"
+GROQ_REQUESTS_PER_MINUTE = 30  # Groq free-tier request limit for llama-3.1-8b-instant
+GROQ_CACHE_SIZE = 1024
+# Share of the rate limit kept free for interactive requests; background work
+# (e.g. prefetching) only runs while more than this many slots are available
+BACKGROUND_RESERVE = GROQ_REQUESTS_PER_MINUTE // 3
 
-def query_groq(prompt, system_message=None, max_retries=3):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+class RateLimiter:
+    """Token bucket shared by every thread that calls Groq in this process"""
+
+    def __init__(self, requests_per_minute):
+        self.capacity = float(requests_per_minute)
+        self.refill_per_second = requests_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def available(self):
+        with self.lock:
+            self._refill()
+            return self.tokens
+
+    def try_acquire(self, reserve=0):
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1 + reserve:
+                self.tokens -= 1
+                return True
+            return False
 
+    def acquire(self, reserve=0):
+        """Block until a request slot is available, leaving `reserve` slots for others"""
+        while not self.try_acquire(reserve):
+            time.sleep(1.0 / self.refill_per_second / 4)
+
+rate_limiter = RateLimiter(GROQ_REQUESTS_PER_MINUTE)
+
+# Completed responses keyed by request payload, shared across sessions
+_response_cache = LRUCache(maxsize=GROQ_CACHE_SIZE)
+_cache_lock = threading.Lock()
+
+def _cache_key(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def get_cached_response(payload):
+    with _cache_lock:
+        return _response_cache.get(_cache_key(payload))
+
+def build_payload(prompt, system_message=None, temperature=0.7, max_tokens=2000, response_format=None):
     messages = []
     if system_message:
         messages.append({"role": "system", "content": system_message})
@@ -20,35 +70,90 @@ def query_groq(prompt, system_message=None, max_retries=3):
     payload = {
         "model": GROQ_MODEL,
         "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": 2000
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if response_format:
+        # e.g. {"type": "json_object"} for structured extraction
+        payload["response_format"] = response_format
+    return payload
+
+def get_groq_api_key():
+    # Read lazily so a missing secret does not break pages that never call the LLM
+    return st.secrets["groq"]["api_key"]
+
+def query_groq(prompt, system_message=None, max_retries=3, temperature=0.7, max_tokens=2000,
+               response_format=None, use_cache=True, quiet=False, background=False):
+    """Send a chat completion to Groq and return the reply text, or None on failure.
+
+    Replies are cached by request payload. Set quiet=True when calling from a
+    background thread, where Streamlit messages cannot be rendered, and
+    background=True for speculative work that must yield to interactive calls.
+    """
+    def report(message, detail=None, warning=False):
+        if quiet:
+            return
+        (st.warning if warning else st.error)(message)
+        if detail:
+            st.code(detail)
+
+    payload = build_payload(prompt, system_message, temperature, max_tokens, response_format)
+    key = _cache_key(payload)
+    if use_cache:
+        with _cache_lock:
+            cached = _response_cache.get(key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            return cached
+
+    try:
+        api_key = get_groq_api_key()
+    except Exception:
+        report("Groq API key is not configured (secrets: groq.api_key).")
+        return None
+
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
     }
 
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(GROQ_ENDPOINT, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-            
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429:  # Rate limit
-                wait_time = 2 ** attempt  # Exponential backoff
-                st.warning(f"Rate limit hit. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-                continue
-            else:
-                st.error("Groq API request failed.")
-                st.code(f"Status: {response.status_code}\nError: {e}\nResponse: {response.text}")
+    with trace("groq", model=GROQ_MODEL) as span:
+        for attempt in range(max_retries):
+            span.retries = attempt
+            try:
+                rate_limiter.acquire(BACKGROUND_RESERVE if background else 0)
+                response = requests.post(GROQ_ENDPOINT, headers=headers, json=payload, timeout=30)
+                span.record_response(response)
+                response.raise_for_status()
+                data = response.json()
+                record_groq_usage(data.get("usage"))
+                content = data["choices"][0]["message"]["content"]
+                if use_cache:
+                    with _cache_lock:
+                        _response_cache[key] = content
+                return content
+
+            except requests.exceptions.HTTPError as e:
+                if response.status_code == 429:  # Rate limit
+                    wait_time = 2 ** attempt  # Exponential backoff
+                    report(f"Rate limit hit. Retrying in {wait_time} seconds...", warning=True)
+                    time.sleep(wait_time)
+                    continue
+                else:
+                    span.error = True
+                    report("Groq API request failed.", f"Status: {response.status_code}\nError: {e}\nResponse: {response.text}")
+                    return None
+
+            except requests.exceptions.Timeout:
+                span.error = True
+                report("Groq API request timed out.")
                 return None
-                
-        except requests.exceptions.Timeout:
-            st.error("Groq API request timed out.")
-            return None
-            
-        except Exception as e:
-            st.error("Unexpected error in Groq API call.")
-            st.code(str(e))
-            return None
-
-    st.error("Max retries exceeded for Groq API.")
-    return None
\ No newline at end of file
+
+            except Exception as e:
+                span.error = True
+                report("Unexpected error in Groq API call.", str(e))
+                return None
+
+        span.error = True
+    report("Max retries exceeded for Groq API.")
+    return None
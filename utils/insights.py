@@ -0,0 +1,271 @@
+import glob
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import jsonschema
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.groq_llm import GROQ_MODEL, query_groq
+from utils.prompts import EVENT_TYPES
+
+# Small per-append files are merged into one once this many accumulate
+COMPACT_AFTER_FILES = 50
+
+INSIGHT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "device": {"type": ["string", "null"]},
+        "company": {"type": ["string", "null"]},
+        "product_codes": {"type": "array", "items": {"type": "string", "pattern": "^[A-Z0-9]{3}$"}},
+        "event_type": {"enum": EVENT_TYPES},
+        "sentiment": {"enum": ["positive", "neutral", "negative"]},
+        "risk_flags": {"type": "array", "items": {"type": "string"}},
+        "summary": {"type": "string"},
+    },
+    "required": ["device", "company", "product_codes", "event_type", "sentiment", "risk_flags", "summary"],
+    "additionalProperties": False,
+}
+
+EXTRACTION_SYSTEM_MESSAGE = (
+    "You extract structured regulatory and market intelligence for MedTech teams. "
+    "Reply with a single JSON object only, matching this JSON schema:\n"
+    + json.dumps(INSIGHT_SCHEMA)
+    + "\nUse null when the device or company is not mentioned. product_codes are 3-character "
+    "FDA product codes. risk_flags are short labels such as 'patient injury', 'class I recall' "
+    "or 'warning letter'; use an empty list when there are none."
+)
+
+INSIGHT_STORE_SCHEMA = pa.schema([
+    ("article_key", pa.string()),
+    ("title", pa.string()),
+    ("source", pa.string()),
+    ("url", pa.string()),
+    ("article_timestamp", pa.timestamp("us", tz="UTC")),
+    ("extracted_at", pa.timestamp("us", tz="UTC")),
+    ("model", pa.string()),
+    ("device", pa.string()),
+    ("company", pa.string()),
+    ("product_codes", pa.list_(pa.string())),
+    ("event_type", pa.string()),
+    ("sentiment", pa.string()),
+    ("risk_flags", pa.list_(pa.string())),
+    ("summary", pa.string()),
+])
+
+_validator = jsonschema.Draft202012Validator(INSIGHT_SCHEMA)
+
+
+def build_extraction_prompt(article):
+    prompt = f"TITLE: {article.title}\nSOURCE: {article.source}\nSUMMARY: {article.summary}\n"
+    if article.raw_text:
+        prompt += f"\nDETAILS:\n{article.raw_text[:6000]}\n"
+    return prompt
+
+
+def validation_errors(insight):
+    return [
+        f"{'/'.join(str(p) for p in error.absolute_path) or '(root)'}: {error.message}"
+        for error in _validator.iter_errors(insight)
+    ]
+
+
+def parse_insight(text):
+    """Parse an LLM reply into (insight, errors); insight is None if not valid JSON"""
+    try:
+        insight = json.loads(text)
+    except (TypeError, json.JSONDecodeError) as e:
+        return None, [f"Invalid JSON: {e}"]
+    return insight, validation_errors(insight)
+
+
+def extract_structured_insight(article, max_repairs=2):
+    """Ask Groq for a schema-conformant insight, retrying with repair prompts on invalid output.
+
+    Returns the validated insight dict, or None if no valid response was produced.
+    Replies bypass the LLM cache so an invalid reply is never replayed; valid
+    insights are persisted in the InsightStore instead.
+    """
+    reply = query_groq(
+        build_extraction_prompt(article),
+        system_message=EXTRACTION_SYSTEM_MESSAGE,
+        temperature=0,
+        max_tokens=800,
+        response_format={"type": "json_object"},
+        use_cache=False
+    )
+    for attempt in range(max_repairs + 1):
+        if reply is None:
+            return None
+        insight, errors = parse_insight(reply)
+        if not errors:
+            return insight
+        if attempt == max_repairs:
+            break
+        repair_prompt = (
+            "Your previous reply did not match the required schema.\n"
+            f"PREVIOUS REPLY:\n{reply}\n\nERRORS:\n" + "\n".join(errors)
+            + "\n\nReturn the corrected JSON object only."
+        )
+        reply = query_groq(
+            repair_prompt,
+            system_message=EXTRACTION_SYSTEM_MESSAGE,
+            temperature=0,
+            max_tokens=800,
+            response_format={"type": "json_object"},
+            use_cache=False
+        )
+    return None
+
+
+class InsightStore:
+    """Append-only columnar store of structured insights, keyed by article.
+
+    Each append writes a new Parquet file under root_dir. The latest insight
+    per article_key is also kept in memory, so get() and queries do not
+    re-read the files. Once COMPACT_AFTER_FILES files pile up they are merged
+    into one automatically.
+    """
+
+    def __init__(self, root_dir="data/insights", compact_after_files=COMPACT_AFTER_FILES):
+        self.root_dir = root_dir
+        self.compact_after_files = compact_after_files
+        self._lock = threading.Lock()
+        self._rows = None
+        self._frame = None
+        self._file_count = 0
+
+    def _files(self):
+        return sorted(glob.glob(os.path.join(self.root_dir, "*.parquet")))
+
+    def _read_table(self):
+        files = self._files()
+        if not files:
+            return INSIGHT_STORE_SCHEMA.empty_table()
+        return pa.concat_tables([pq.read_table(f, schema=INSIGHT_STORE_SCHEMA) for f in files])
+
+    def _load(self):
+        # Caller holds the lock; reads the files once per process
+        if self._rows is None:
+            self._file_count = len(self._files())
+            rows = sorted(self._read_table().to_pylist(), key=lambda r: r["extracted_at"])
+            self._rows = {row["article_key"]: row for row in rows}
+        return self._rows
+
+    def keys(self):
+        with self._lock:
+            return set(self._load())
+
+    def has(self, article_key):
+        with self._lock:
+            return article_key in self._load()
+
+    def append(self, article, insight, model=GROQ_MODEL):
+        row = {
+            "article_key": article.key,
+            "title": article.title,
+            "source": article.source,
+            "url": article.url,
+            "article_timestamp": article.timestamp,
+            "extracted_at": datetime.now(timezone.utc),
+            "model": model,
+            "device": insight.get("device"),
+            "company": insight.get("company"),
+            "product_codes": insight.get("product_codes", []),
+            "event_type": insight.get("event_type"),
+            "sentiment": insight.get("sentiment"),
+            "risk_flags": insight.get("risk_flags", []),
+            "summary": insight.get("summary"),
+        }
+        table = pa.Table.from_pylist([row], schema=INSIGHT_STORE_SCHEMA)
+        with self._lock:
+            rows = self._load()
+            os.makedirs(self.root_dir, exist_ok=True)
+            pq.write_table(table, os.path.join(self.root_dir, f"insights-{uuid.uuid4().hex}.parquet"))
+            rows[article.key] = row
+            self._frame = None
+            self._file_count += 1
+            if self._file_count >= self.compact_after_files:
+                self._compact()
+
+    def _latest_frame(self):
+        with self._lock:
+            if self._frame is None:
+                rows = sorted(self._load().values(), key=lambda r: r["extracted_at"])
+                table = pa.Table.from_pylist(rows, schema=INSIGHT_STORE_SCHEMA)
+                self._frame = table.to_pandas()
+            return self._frame
+
+    def to_pandas(self):
+        """Return the latest insight per article as a DataFrame"""
+        return self._latest_frame().copy()
+
+    def get(self, article_key):
+        with self._lock:
+            row = self._load().get(article_key)
+        if row is None:
+            return None
+        return {
+            "device": row["device"],
+            "company": row["company"],
+            "product_codes": list(row["product_codes"] or []),
+            "event_type": row["event_type"],
+            "sentiment": row["sentiment"],
+            "risk_flags": list(row["risk_flags"] or []),
+            "summary": row["summary"],
+        }
+
+    def query(self, event_type=None, company=None, since=None):
+        """Filter stored insights by event type, company (case-insensitive substring) and article date"""
+        df = self._latest_frame()
+        if df.empty:
+            return df.copy()
+        if event_type:
+            df = df[df["event_type"] == event_type]
+        if company:
+            df = df[df["company"].fillna("").str.contains(company, case=False, regex=False)]
+        if since is not None:
+            df = df[df["article_timestamp"] >= since]
+        return df.reset_index(drop=True)
+
+    def count_by_company(self, event_type=None, since=None):
+        """e.g. count_by_company("recall", since=start_of_quarter)"""
+        df = self.query(event_type=event_type, since=since)
+        if df.empty:
+            return df
+        return df.groupby("company").size().sort_values(ascending=False).rename("events").reset_index()
+
+    def _compact(self):
+        # Caller holds the lock. Other processes may share root_dir, so the files
+        # being replaced are re-read and merged rather than trusting memory alone.
+        files = self._files()
+        if len(files) < 2:
+            return
+        rows = self._load()
+        on_disk = []
+        for f in files:
+            try:
+                on_disk.extend(pq.read_table(f, schema=INSIGHT_STORE_SCHEMA).to_pylist())
+            except FileNotFoundError:
+                continue  # already compacted by another process
+        for row in on_disk:
+            current = rows.get(row["article_key"])
+            if current is None or row["extracted_at"] > current["extracted_at"]:
+                rows[row["article_key"]] = row
+        self._frame = None
+        table = pa.Table.from_pylist(sorted(rows.values(), key=lambda r: r["extracted_at"]), schema=INSIGHT_STORE_SCHEMA)
+        pq.write_table(table, os.path.join(self.root_dir, f"insights-{uuid.uuid4().hex}.parquet"))
+        for f in files:
+            try:
+                os.remove(f)
+            except FileNotFoundError:
+                pass
+        self._file_count = 1
+
+    def compact(self):
+        """Merge all insight files into one, keeping the latest insight per article"""
+        with self._lock:
+            self._compact()
@@ -0,0 +1,200 @@
+"""Process-wide latency, transfer and cache metrics for fetchers and the LLM client.
+
+Hot paths wrap their work in `trace(...)` spans. Spans feed histograms and
+counters that the diagnostics panel shows and that can be exported in
+Prometheus text format.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+METRIC_HELP = {
+    "liberty_latency_seconds": "Latency of traced operations",
+    "liberty_response_bytes": "Size of upstream HTTP response bodies",
+    "liberty_http_responses_total": "Upstream HTTP responses by status code",
+    "liberty_retries_total": "Retried upstream requests",
+    "liberty_errors_total": "Traced operations that failed",
+    "liberty_cache_requests_total": "Cache lookups by result",
+    "liberty_groq_tokens_total": "Groq tokens reported in response usage",
+    "liberty_groq_tokens_per_request": "Groq tokens per request",
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket containing it"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """Rows summarizing every metric series, for display in the app"""
+        rows = []
+        with self._lock:
+            for (name, labels), h in sorted(self._histograms.items()):
+                rows.append({
+                    "metric": name,
+                    "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                    "count": h.count,
+                    "sum": round(h.sum, 4),
+                    "mean": round(h.sum / h.count, 4) if h.count else None,
+                    "p50<=": h.quantile(0.5),
+                    "p95<=": h.quantile(0.95),
+                    "p99<=": h.quantile(0.99),
+                })
+            for (name, labels), value in sorted(self._counters.items()):
+                rows.append({
+                    "metric": name,
+                    "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                    "count": value,
+                    "sum": None, "mean": None, "p50<=": None, "p95<=": None, "p99<=": None,
+                })
+        return rows
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+            seen = set()
+            for (name, labels), h in histograms:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                    lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{label_text(labels, [('le', repr(float(bound)))])} {cumulative}")
+                lines.append(f"{name}_bucket{label_text(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{name}_sum{label_text(labels)} {h.sum}")
+                lines.append(f"{name}_count{label_text(labels)} {h.count}")
+
+            for (name, labels), value in counters:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class Span:
+    """Mutable record for one traced operation; filled in by the code being traced"""
+
+    __slots__ = ("operation", "labels", "status", "bytes", "retries", "error")
+
+    def __init__(self, operation, labels):
+        self.operation = operation
+        self.labels = labels
+        self.status = None
+        self.bytes = None
+        self.retries = 0
+        self.error = False
+
+    def record_response(self, response):
+        """Record HTTP status and body size from a requests.Response"""
+        self.status = response.status_code
+        self.bytes = (self.bytes or 0) + len(response.content or b"")
+
+
+@contextmanager
+def trace(operation, **labels):
+    """Time a block and record its latency, HTTP status, bytes, retries and errors.
+
+        with trace("fetch", source="newsapi") as span:
+            response = requests.get(url)
+            span.record_response(response)
+    """
+    span = Span(operation, labels)
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception:
+        span.error = True
+        raise
+    finally:
+        registry.observe("liberty_latency_seconds", time.perf_counter() - start, operation=operation, **labels)
+        if span.status is not None:
+            registry.inc("liberty_http_responses_total", operation=operation, status=span.status, **labels)
+        if span.bytes is not None:
+            registry.observe("liberty_response_bytes", span.bytes, buckets=BYTES_BUCKETS, operation=operation, **labels)
+        if span.retries:
+            registry.inc("liberty_retries_total", span.retries, operation=operation, **labels)
+        if span.error:
+            registry.inc("liberty_errors_total", operation=operation, **labels)
+
+
+def record_cache_lookup(cache, hit):
+    registry.inc("liberty_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_groq_usage(usage):
+    """Record token counts from a Groq response's `usage` block"""
+    for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        if usage and usage.get(kind) is not None:
+            registry.inc("liberty_groq_tokens_total", usage[kind], type=kind)
+            registry.observe("liberty_groq_tokens_per_request", usage[kind], buckets=TOKEN_BUCKETS, type=kind)
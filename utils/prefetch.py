@@ -0,0 +1,90 @@
+import itertools
+import queue
+import threading
+import time
+
+from utils.groq_llm import BACKGROUND_RESERVE, build_payload, get_cached_response, query_groq, rate_limiter
+from utils.prompts import build_insight_prompt
+
+PREFETCH_TOP_N = 5
+
+
+class InsightPrefetcher:
+    """Background worker that speculatively runs "Extract Insights" for top-ranked articles.
+
+    One worker is shared by all sessions. Each session's jobs carry a generation
+    number; scheduling a new query bumps the generation, so queued jobs for the
+    old query are dropped. Results land in the Groq response cache, where the
+    interactive button picks them up.
+    """
+
+    def __init__(self):
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._generations = {}
+        self._signatures = {}
+        self._stats = {"completed": 0, "skipped_cached": 0, "cancelled": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="insight-prefetch", daemon=True)
+            self._thread.start()
+
+    def schedule(self, session_id, articles, system_message, top_n=PREFETCH_TOP_N):
+        """Queue the top-N articles for a session, cancelling its previous batch if the query changed"""
+        top = articles[:top_n]
+        signature = (system_message, tuple(a.key for a in top))
+        with self._lock:
+            if self._signatures.get(session_id) == signature:
+                return
+            self._signatures[session_id] = signature
+            generation = self._generations.get(session_id, 0) + 1
+            self._generations[session_id] = generation
+            for rank, article in enumerate(top):
+                self._queue.put((rank, next(self._sequence), session_id, generation, article, system_message))
+            self._ensure_worker()
+
+    def cancel(self, session_id):
+        with self._lock:
+            self._generations[session_id] = self._generations.get(session_id, 0) + 1
+            self._signatures.pop(session_id, None)
+
+    def _is_stale(self, session_id, generation):
+        with self._lock:
+            return self._generations.get(session_id) != generation
+
+    def _record(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=self._queue.qsize())
+
+    def _run(self):
+        while True:
+            rank, _, session_id, generation, article, system_message = self._queue.get()
+            try:
+                if self._is_stale(session_id, generation):
+                    self._record("cancelled")
+                    continue
+                prompt = build_insight_prompt(article)
+                if get_cached_response(build_payload(prompt, system_message)) is not None:
+                    self._record("skipped_cached")
+                    continue
+                # Low priority: wait until interactive requests have headroom, dropping the job if it goes stale
+                while rate_limiter.available() < 1 + BACKGROUND_RESERVE:
+                    if self._is_stale(session_id, generation):
+                        break
+                    time.sleep(0.5)
+                if self._is_stale(session_id, generation):
+                    self._record("cancelled")
+                    continue
+                result = query_groq(prompt, system_message=system_message, quiet=True, background=True)
+                self._record("completed" if result else "failed")
+            except Exception:
+                self._record("failed")
+            finally:
+                self._queue.task_done()
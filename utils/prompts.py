@@ -0,0 +1,32 @@
+# Event categories for structured insight extraction (see utils.insights). Kept
+# here, free of heavy imports, so the app can list them without loading pyarrow.
+EVENT_TYPES = [
+    "510k_clearance", "pma_approval", "recall", "adverse_event", "classification",
+    "clinical_trial", "product_launch", "partnership", "financial", "other",
+]
+
+
+def build_insight_prompt(article):
+    """Prompt for the free-form "Extract Insights" action.
+
+    Shared by the app and the prefetcher so both produce identical requests
+    and therefore hit the same LLM cache entry.
+    """
+    # Enhanced prompt for OpenFDA data
+    if article.is_openfda:
+        return f"""
+        Analyze this regulatory data from OpenFDA and provide insights for MedTech professionals:
+        
+        TITLE: {article.title}
+        SUMMARY: {article.summary}
+        
+        RAW REGULATORY DATA:
+        {article.raw_text}
+        
+        Please provide:
+        1. Key regulatory insights
+        2. Potential business implications
+        3. Competitive intelligence
+        4. Any safety or compliance concerns
+        """
+    return article.summary
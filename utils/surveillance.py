@@ -0,0 +1,237 @@
+"""Adverse-event trend surveillance across a watchlist of product codes or manufacturers.
+
+Event counts per day come from OpenFDA `count=date_received` queries (one per
+watchlist entry, run in parallel) or from a local Parquet mirror written by
+utils.export. They are pivoted into one series per entity. Rolling baselines
+and z-scores are then computed for the whole watchlist at once with pandas.
+Only the flagged spikes are sent to the LLM for a narrative.
+"""
+import os
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sources.openfda_source import fetch_openfda_counts, sanitize_company_name
+from utils.groq_llm import query_groq
+
+EVENT_ENDPOINT = "/device/event.json"
+# Watchlist entity -> (OpenFDA search field, column in the Parquet mirror)
+ENTITY_FIELDS = {
+    "product_code": ("device.device_report_product_code", "device_device_report_product_code"),
+    "manufacturer": ("device.manufacturer_d_name", "device_manufacturer_d_name"),
+}
+FREQUENCIES = {"Daily": "D", "Weekly": "W-MON"}
+DEFAULT_WINDOWS = {"D": 28, "W-MON": 8}
+Z_THRESHOLD = 3.0
+MIN_SPIKE_COUNT = 3
+MAX_WORKERS = 8
+MAX_NARRATED_SPIKES = 15
+NARRATIVE_MAX_TOKENS = 700
+
+NARRATIVE_SYSTEM_MESSAGE = (
+    "You are a post-market surveillance analyst for medical devices. Given statistical "
+    "spikes in FDA MAUDE adverse event reports, explain briefly which spikes look most "
+    "significant, what could plausibly drive them (reporting artifacts, recalls, new "
+    "devices, seasonal effects) and what a regulatory or sales team should check next. "
+    "Do not invent facts beyond the data given."
+)
+
+
+def _search_value(value, entity="product_code"):
+    """Watchlist entry as a URL-safe phrase; manufacturers are sanitized like OpenFDA query parameters"""
+    value = value.replace('"', "").strip()
+    if entity == "manufacturer":
+        value = sanitize_company_name(value)
+    return urllib.parse.quote(value.replace(" ", "+"), safe="+")
+
+
+def _phrase_key(names):
+    """Lowercase words joined and padded by single spaces, '&' read as 'and', for phrase matching"""
+    words = names.str.lower().str.replace("&", " and ", regex=False).str.replace(r"[^a-z0-9]+", " ", regex=True)
+    return " " + words.str.strip() + " "
+
+
+def fetch_entity_counts(value, start_date, end_date, entity="product_code"):
+    """Daily event counts for one watchlist entry as a list of (date, count)"""
+    field = ENTITY_FIELDS[entity][0]
+    query_string = (
+        f'search={field}:"{_search_value(value, entity)}"'
+        f"+AND+date_received:[{start_date:%Y%m%d}+TO+{end_date:%Y%m%d}]"
+    )
+    buckets = fetch_openfda_counts(EVENT_ENDPOINT, "date_received", query_string)
+    return [(b["time"], b["count"]) for b in buckets if "time" in b]
+
+
+def fetch_event_counts(watchlist, start_date, end_date, entity="product_code", max_workers=MAX_WORKERS):
+    """Fetch daily counts for every watchlist entry in parallel.
+
+    Returns (counts, failed): counts is a long DataFrame with columns
+    entity, date and count; failed lists the entries whose request errored.
+    """
+    def fetch(value):
+        try:
+            return value, fetch_entity_counts(value, start_date, end_date, entity), None
+        except Exception as e:
+            return value, [], str(e)
+
+    rows, failed = [], []
+    if watchlist:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(watchlist))) as pool:
+            for value, buckets, error in pool.map(fetch, watchlist):
+                if error:
+                    failed.append(value)
+                rows.extend((value, day, count) for day, count in buckets)
+    counts = pd.DataFrame(rows, columns=["entity", "date", "count"])
+    counts["date"] = pd.to_datetime(counts["date"], format="%Y%m%d", errors="coerce")
+    return counts.dropna(subset=["date"]), failed
+
+
+def load_event_counts_from_parquet(root_dir, watchlist=None, entity="product_code"):
+    """Daily event counts from a Parquet mirror of /device/event.json exports.
+
+    Files from other endpoints in the same tree are skipped. Every export
+    writes new files, so a report exported more than once is counted once,
+    by `mdr_report_key`. Multi-valued fields (joined with '; ' on export)
+    count once for each value. Product codes match exactly; manufacturers
+    match as a phrase anywhere in the name, as the OpenFDA search does.
+    """
+    import pyarrow.dataset as ds
+
+    if not os.path.isdir(root_dir):
+        raise FileNotFoundError(f"Parquet mirror not found: {root_dir}")
+    column = ENTITY_FIELDS[entity][1]
+    columns = ["mdr_report_key", column, "date_received"]
+    dataset = ds.dataset(root_dir, format="parquet", partitioning="hive")
+    tables = [
+        fragment.to_table(columns=columns)
+        for fragment in dataset.get_fragments()
+        if set(columns) <= set(fragment.physical_schema.names)
+    ]
+    if not tables:
+        return pd.DataFrame({"entity": pd.Series(dtype=str), "date": pd.Series(dtype="datetime64[ns]"),
+                             "count": pd.Series(dtype=np.int64)})
+
+    frame = pd.concat([t.to_pandas() for t in tables], ignore_index=True)
+    keyed = frame["mdr_report_key"].notna()
+    frame = pd.concat([frame[keyed].drop_duplicates(subset="mdr_report_key"), frame[~keyed]])
+    frame = frame.rename(columns={column: "entity"}).dropna(subset=["entity", "date_received"])
+    frame["entity"] = frame["entity"].str.split("; ")
+    frame = frame.explode("entity")
+    frame["entity"] = frame["entity"].str.strip()
+    if watchlist and entity == "manufacturer":
+        # Phrase match like the API search, so "Medtronic" also counts "MEDTRONIC MINIMED, INC.";
+        # a report counts once for every watchlist entry it matches
+        names = _phrase_key(frame["entity"])
+        entries = pd.Series(watchlist, index=watchlist)
+        matched = [frame[names.str.contains(key, regex=False)].assign(entity=value)
+                   for value, key in _phrase_key(entries).items() if key.strip()]
+        frame = pd.concat(matched) if matched else frame.iloc[:0]
+    elif watchlist:
+        # Match case-insensitively, but report entities as the watchlist spells them
+        spelling = {value.upper(): value for value in watchlist}
+        frame["entity"] = frame["entity"].str.upper().map(spelling)
+        frame = frame.dropna(subset=["entity"])
+    frame["date"] = pd.to_datetime(frame["date_received"], format="%Y%m%d", errors="coerce")
+    frame = frame.dropna(subset=["date"])
+    return frame.groupby(["entity", "date"]).size().rename("count").reset_index()
+
+
+def build_event_series(counts, freq="D", start=None, end=None, entities=None):
+    """Pivot long counts into a date x entity matrix with zero-filled gaps.
+
+    `start` and `end` may carry a time of day (e.g. datetime.now()); they are
+    truncated to midnight to line up with the daily counts.
+    """
+    series = counts.pivot_table(index="date", columns="entity", values="count", aggfunc="sum", fill_value=0)
+    if entities is not None:
+        series = series.reindex(columns=list(entities), fill_value=0)
+    start = pd.Timestamp(start).normalize() if start is not None else (series.index.min() if len(series) else None)
+    end = pd.Timestamp(end).normalize() if end is not None else (series.index.max() if len(series) else None)
+    if start is not None and end is not None:
+        series = series.reindex(pd.date_range(start, end, freq="D"), fill_value=0)
+    if freq != "D":
+        # Label each period by its first day
+        series = series.resample(freq, label="left", closed="left").sum()
+    series.index.name = "date"
+    series.columns.name = "entity"
+    return series.astype(np.float64)
+
+
+def detect_spikes(series, window=None, z_threshold=Z_THRESHOLD, min_count=MIN_SPIKE_COUNT, freq="D"):
+    """Flag periods whose count is far above the trailing baseline, for every entity at once.
+
+    The baseline is the rolling mean and standard deviation of the previous
+    `window` periods, excluding the current one. The deviation is floored at
+    sqrt(mean) and 1, so sparse series do not produce huge z-scores from a
+    single report. Returns (zscores, spikes). zscores has the same shape as
+    `series`. spikes is a long DataFrame sorted by z-score.
+    """
+    window = window or DEFAULT_WINDOWS.get(freq, 28)
+    history = series.shift(1).rolling(window, min_periods=max(2, window // 2))
+    baseline = history.mean()
+    spread = np.maximum(history.std(), np.sqrt(baseline)).clip(lower=1.0)
+    zscores = (series - baseline) / spread
+
+    flags = (zscores >= z_threshold) & (series >= min_count)
+    rows, cols = np.nonzero(flags.to_numpy())
+    spikes = pd.DataFrame({
+        "entity": series.columns.to_numpy()[cols],
+        "date": series.index.to_numpy()[rows],
+        "count": series.to_numpy()[rows, cols],
+        "baseline": baseline.to_numpy()[rows, cols],
+        "z_score": zscores.to_numpy()[rows, cols],
+    })
+    return zscores, spikes.sort_values("z_score", ascending=False, ignore_index=True)
+
+
+def analyze_watchlist(watchlist, start_date, end_date, entity="product_code", freq="D", window=None,
+                      z_threshold=Z_THRESHOLD, min_count=MIN_SPIKE_COUNT, parquet_dir=None):
+    """Build event series for a watchlist and flag spikes.
+
+    Counts come from the Parquet mirror when `parquet_dir` is given, otherwise
+    from OpenFDA. Returns a dict with the series, z-scores, spikes and any
+    watchlist entries that failed to load.
+    """
+    watchlist = [v.strip() for v in watchlist if v and v.strip()]
+    if entity == "product_code":
+        watchlist = [v.upper() for v in watchlist]
+    watchlist = list(dict.fromkeys(watchlist))
+    start_date = pd.Timestamp(start_date).normalize()
+    end_date = pd.Timestamp(end_date).normalize()
+    if parquet_dir:
+        counts, failed = load_event_counts_from_parquet(parquet_dir, watchlist, entity), []
+        counts = counts[(counts["date"] >= start_date) & (counts["date"] <= end_date)]
+    else:
+        counts, failed = fetch_event_counts(watchlist, start_date, end_date, entity)
+    series = build_event_series(counts, freq, start_date, end_date, entities=watchlist)
+    zscores, spikes = detect_spikes(series, window, z_threshold, min_count, freq)
+    return {"series": series, "zscores": zscores, "spikes": spikes, "failed": failed}
+
+
+def build_spike_prompt(spikes, entity="product_code", describe=None, max_spikes=MAX_NARRATED_SPIKES):
+    label = "Product code" if entity == "product_code" else "Manufacturer"
+    lines = []
+    for row in spikes.head(max_spikes).itertuples(index=False):
+        name = describe(row.entity) if describe else row.entity
+        lines.append(
+            f"- {label}: {name} | Period starting {row.date:%Y-%m-%d} | Reports: {row.count:.0f} "
+            f"| Baseline: {row.baseline:.1f} | z-score: {row.z_score:.1f}"
+        )
+    omitted = len(spikes) - len(lines)
+    if omitted > 0:
+        lines.append(f"- ... and {omitted} smaller spikes")
+    return "ADVERSE EVENT REPORT SPIKES (FDA MAUDE):\n" + "\n".join(lines) + "\n\nWrite a short surveillance briefing."
+
+
+def narrate_spikes(spikes, entity="product_code", describe=None, max_spikes=MAX_NARRATED_SPIKES):
+    """One LLM call covering the strongest flagged spikes; None when nothing was flagged"""
+    if spikes is None or spikes.empty:
+        return None
+    return query_groq(
+        build_spike_prompt(spikes, entity, describe, max_spikes),
+        system_message=NARRATIVE_SYSTEM_MESSAGE,
+        temperature=0.2,
+        max_tokens=NARRATIVE_MAX_TOKENS
+    )